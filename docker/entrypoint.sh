@@ -35,6 +35,9 @@ elif [ "$ROLE" = "worker" ]; then
   # Start poller (async) with default interval; env POLL_INTERVAL can override
   INTERVAL="${POLL_INTERVAL:-1.0}"
   exec python manage.py poll_modbus --interval "$INTERVAL"
+elif [ "$ROLE" = "rollup" ]; then
+  # Rollups and retention; RETAIN_*_DAYS set how long each tier is kept
+  exec python manage.py rollup_samples --every "${ROLLUP_EVERY:-60}"
 else
   exec "$@"
 fi
@@ -1,6 +1,17 @@
 from django.contrib import admin
 from django.contrib import messages
-from .models import ModbusDevice, PollResult, ModbusCard, ModbusActionCard
+from django.db import transaction
+from .models import ModbusDevice, ModbusRange, ModbusTag, ScanClass, PollResult, ModbusCard, ModbusActionCard, DeviceLease, PollerNode
+
+
+class ModbusRangeInline(admin.TabularInline):
+    model = ModbusRange
+    extra = 0
+
+
+class ModbusTagInline(admin.TabularInline):
+    model = ModbusTag
+    extra = 0
 
 
 @admin.register(ModbusDevice)
@@ -9,12 +20,13 @@ class ModbusDeviceAdmin(admin.ModelAdmin):
     list_filter = ("enabled",)
     save_as = True  # enables "Save as new" to clone a device and then change the name
     actions = ["duplicate_devices"]
+    inlines = [ModbusRangeInline, ModbusTagInline]
     fieldsets = (
         (None, {
             'fields': ("name", "enabled")
         }),
         ("Connection", {
-            'fields': ("host", "port", "unit_id", "poll_interval_ms"),
+            'fields': ("host", "port", "unit_id", ("poll_interval_ms", "align_group"), ("pipeline_depth", "max_concurrent_reads"), ("timeout_ms", "retries")),
         }),
         ("Ranges", {
             'fields': (
@@ -22,39 +34,66 @@ class ModbusDeviceAdmin(admin.ModelAdmin):
                 ("ir_start", "ir_count"),
                 ("hr_start", "hr_count"),
                 ("coil_start", "coil_count"),
+                "max_read_gap",
             )
         }),
         ("Holding Decode", {
             'fields': ("hr_datatype", ("hr_byte_order", "hr_word_order"), "hr_decimals"),
         }),
+        ("Storage", {
+            'fields': ("storage_mode", ("deadband_abs", "deadband_pct"), "heartbeat_s"),
+        }),
     )
 
     @admin.action(description="Duplicate selected devices")
     def duplicate_devices(self, request, queryset):
         created = 0
-        for obj in queryset:
-            dup = ModbusDevice(
-                name=f"Copy of {obj.name}",
-                host=obj.host,
-                port=obj.port,
-                unit_id=obj.unit_id,
-                enabled=obj.enabled,
-                di_start=obj.di_start,
-                di_count=obj.di_count,
-                ir_start=obj.ir_start,
-                ir_count=obj.ir_count,
-                hr_start=obj.hr_start,
-                hr_count=obj.hr_count,
-                hr_datatype=obj.hr_datatype,
-                hr_byte_order=obj.hr_byte_order,
-                hr_word_order=obj.hr_word_order,
-                hr_decimals=obj.hr_decimals,
-                coil_start=obj.coil_start,
-                coil_count=obj.coil_count,
-                poll_interval_ms=obj.poll_interval_ms,
-            )
-            dup.save()
-            created += 1
+        # One transaction, so pollers are told about each copy only once its ranges and tags exist
+        with transaction.atomic():
+            for obj in queryset:
+                dup = ModbusDevice(
+                    name=f"Copy of {obj.name}",
+                    host=obj.host,
+                    port=obj.port,
+                    unit_id=obj.unit_id,
+                    enabled=obj.enabled,
+                    di_start=obj.di_start,
+                    di_count=obj.di_count,
+                    ir_start=obj.ir_start,
+                    ir_count=obj.ir_count,
+                    hr_start=obj.hr_start,
+                    hr_count=obj.hr_count,
+                    hr_datatype=obj.hr_datatype,
+                    hr_byte_order=obj.hr_byte_order,
+                    hr_word_order=obj.hr_word_order,
+                    hr_decimals=obj.hr_decimals,
+                    coil_start=obj.coil_start,
+                    coil_count=obj.coil_count,
+                    poll_interval_ms=obj.poll_interval_ms,
+                    pipeline_depth=obj.pipeline_depth,
+                    max_concurrent_reads=obj.max_concurrent_reads,
+                    align_group=obj.align_group,
+                    timeout_ms=obj.timeout_ms,
+                    retries=obj.retries,
+                    storage_mode=obj.storage_mode,
+                    deadband_abs=obj.deadband_abs,
+                    deadband_pct=obj.deadband_pct,
+                    heartbeat_s=obj.heartbeat_s,
+                    max_read_gap=obj.max_read_gap,
+                )
+                dup.save()
+                ModbusRange.objects.bulk_create(
+                    ModbusRange(device=dup, table=r.table, start=r.start, count=r.count, scan_class=r.scan_class)
+                    for r in obj.ranges.all()
+                )
+                ModbusTag.objects.bulk_create(
+                    ModbusTag(
+                        device=dup, name=t.name, table=t.table, address=t.address, datatype=t.datatype,
+                        byte_order=t.byte_order, word_order=t.word_order, scale=t.scale, decimals=t.decimals,
+                    )
+                    for t in obj.tags.all()
+                )
+                created += 1
         if created:
             self.message_user(request, f"Duplicated {created} device(s).", level=messages.SUCCESS)
         else:
@@ -63,15 +102,15 @@ class ModbusDeviceAdmin(admin.ModelAdmin):
 
 @admin.register(PollResult)
 class PollResultAdmin(admin.ModelAdmin):
-    list_display = ("device", "created_at", "ok")
+    list_display = ("device", "created_at", "ok", "cycle_id")
     list_filter = ("ok", "device")
     readonly_fields = ("created_at",)
 
 
 @admin.register(ModbusCard)
 class ModbusCardAdmin(admin.ModelAdmin):
-    list_display = ("device", "order", "name", "source", "address", "unit_label", "decimals")
-    list_filter = ("device", "source")
+    list_display = ("device", "order", "name", "source", "address", "unit_label", "decimals", "scan_class")
+    list_filter = ("device", "source", "scan_class")
     search_fields = ("name",)
     ordering = ("device", "order", "id")
 
@@ -82,3 +121,19 @@ class ModbusActionCardAdmin(admin.ModelAdmin):
     list_filter = ("device",)
     search_fields = ("name",)
     ordering = ("device", "order", "id")
+
+
+@admin.register(ScanClass)
+class ScanClassAdmin(admin.ModelAdmin):
+    list_display = ("name", "interval_ms")
+
+
+@admin.register(PollerNode)
+class PollerNodeAdmin(admin.ModelAdmin):
+    list_display = ("name", "last_seen")
+
+
+@admin.register(DeviceLease)
+class DeviceLeaseAdmin(admin.ModelAdmin):
+    list_display = ("device", "owner", "expires_at")
+    list_filter = ("owner",)
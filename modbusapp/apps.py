@@ -5,3 +5,6 @@ class ModbusAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'modbusapp'
     verbose_name = 'Modbus App'
+
+    def ready(self):
+        from . import signals  # noqa: F401
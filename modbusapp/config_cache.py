@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import F
+from .models import ConfigVersion, ModbusDevice
+
+logger = logging.getLogger(__name__)
+
+CONFIG_CHANNEL = 'modbus_config'
+
+
+def notify_config_changed(label: str = '', using: str = 'default'):
+    """Bump the config version and, on Postgres, NOTIFY listening pollers.
+
+    Runs inside the caller's transaction, so pollers only hear about changes
+    that were committed.
+    """
+    if not ConfigVersion.objects.using(using).filter(pk=1).update(version=F('version') + 1):
+        ConfigVersion.objects.using(using).get_or_create(pk=1, defaults={'version': 1})
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [CONFIG_CHANNEL, label])
+
+
+def load_devices() -> dict[int, ModbusDevice]:
+    qs = ModbusDevice.objects.filter(enabled=True).prefetch_related('cards__scan_class', 'ranges__scan_class', 'tags').order_by('id')
+    return {d.id: d for d in qs}
+
+
+def current_version() -> int:
+    return ConfigVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+class DeviceConfigCache:
+    """In-process copy of the enabled device configs for the poller.
+
+    The whole device list is reloaded whenever a config model is saved or
+    deleted (see ``modbusapp.signals``). On Postgres a dedicated connection
+    LISTENs on ``modbus_config`` and the event loop wakes up on its socket, so
+    changes arrive immediately and an idle poller runs no config queries at
+    all. Elsewhere, or if the listener fails, the cache compares the
+    ConfigVersion counter every ``check_interval`` seconds. Changes made with
+    ``QuerySet.update()`` skip signals and are not seen until the next one.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        self.devices: dict[int, ModbusDevice] = {}
+        self.version = -1
+        self._changed = asyncio.Event()
+        self._dirty = asyncio.Event()
+        self._listener = None
+        self._task: asyncio.Task | None = None
+
+    def get(self, device_id: int) -> ModbusDevice | None:
+        return self.devices.get(device_id)
+
+    def all(self) -> list[ModbusDevice]:
+        return list(self.devices.values())
+
+    async def start(self):
+        await self.reload()
+        await self._listen()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._unlisten()
+
+    async def reload(self):
+        def load():
+            return current_version(), load_devices()
+        self.version, self.devices = await sync_to_async(load)()
+        self._changed.set()
+
+    async def wait_changed(self, timeout: float | None = None) -> bool:
+        """Wait until the device list changes; True if it did within ``timeout``."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._changed.clear()
+        return True
+
+    async def _run(self):
+        while True:
+            if self._listener is not None:
+                await self._dirty.wait()
+                self._dirty.clear()
+                await self._reload_quietly()
+                continue
+            await asyncio.sleep(self.check_interval)
+            try:
+                version = await sync_to_async(current_version)()
+            except Exception as e:
+                logger.warning("Config version check failed: %s", e)
+                continue
+            if version != self.version:
+                await self._reload_quietly()
+
+    async def _reload_quietly(self):
+        try:
+            await self.reload()
+        except Exception as e:
+            logger.warning("Config reload failed: %s", e)
+
+    @staticmethod
+    def _connect():
+        import psycopg2.extensions
+        connection = connections['default']
+        conn = connection.get_new_connection(connection.get_connection_params())
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CONFIG_CHANNEL}")
+        return conn
+
+    async def _listen(self):
+        if connections['default'].vendor != 'postgresql':
+            return
+        conn = None
+        try:
+            # Django refuses to open connections on the event loop thread
+            conn = await sync_to_async(self._connect)()
+            asyncio.get_running_loop().add_reader(conn.fileno(), self._on_notify)
+        except Exception as e:
+            if conn is not None:
+                conn.close()
+            logger.warning("LISTEN %s unavailable (%s); polling the config version instead", CONFIG_CHANNEL, e)
+            return
+        self._listener = conn
+
+    def _unlisten(self):
+        conn, self._listener = self._listener, None
+        if conn is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(conn.fileno())
+            conn.close()
+        except Exception:
+            pass
+
+    def _on_notify(self):
+        try:
+            self._listener.poll()
+        except Exception as e:
+            logger.warning("Config listener lost (%s); polling the config version instead", e)
+            self._unlisten()
+            self._dirty.set()
+            return
+        if self._listener.notifies:
+            self._listener.notifies.clear()
+            self._dirty.set()
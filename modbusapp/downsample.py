@@ -0,0 +1,78 @@
+from collections import deque
+from datetime import datetime
+from .models import Sample
+
+
+def _area(a: tuple, b: tuple, c: tuple) -> float:
+    # Twice the triangle's area; only comparisons use it
+    return abs((a[0] - c[0]) * (b[1] - a[1]) - (a[0] - b[0]) * (c[1] - a[1]))
+
+
+def lttb(rows, start: datetime, end: datetime, points: int) -> list[dict]:
+    """Largest-Triangle-Three-Buckets over chronological ``(ts, value)`` rows, read in one pass.
+
+    The first and last rows are kept and the window between them is split into
+    ``points - 2`` equal time slots. Each non-empty slot contributes the row
+    that makes the largest triangle with the row kept before it and the average
+    of the next non-empty slot, so spikes and dips survive. Only two slots are
+    held at a time, however long the window.
+    """
+    slots = max(1, points - 2)
+    t0 = start.timestamp()
+    width = max((end.timestamp() - t0) / slots, 1e-6)
+    series = []
+    anchor = None  # last row kept, as (epoch, value, ts)
+    pending = deque()  # up to two [slot, rows]
+    last = None
+
+    def keep(row):
+        nonlocal anchor
+        anchor = row
+        series.append({'t': row[2].isoformat(), 'v': row[1]})
+
+    def decide(bucket, following):
+        n = len(following)
+        avg = (sum(r[0] for r in following) / n, sum(r[1] for r in following) / n)
+        keep(max(bucket, key=lambda r: _area(anchor, r, avg)))
+
+    def place(row):
+        slot = min(slots - 1, max(0, int((row[0] - t0) // width)))
+        if pending and pending[-1][0] == slot:
+            pending[-1][1].append(row)
+            return
+        if len(pending) == 2:
+            decide(pending[0][1], pending[1][1])
+            pending.popleft()
+        pending.append([slot, [row]])
+
+    for ts, value in rows:
+        row = (ts.timestamp(), value, ts)
+        if anchor is None:
+            keep(row)
+        else:
+            # Placed one row late, so the final row stays out of the slots
+            if last is not None:
+                place(last)
+            last = row
+    if last is None:
+        return series
+    while pending:
+        _, bucket = pending.popleft()
+        decide(bucket, pending[0][1] if pending else [last])
+    keep(last)
+    return series
+
+
+def lttb_series(device_id: int, source: str, address: int,
+                start: datetime, end: datetime, points: int) -> list[dict]:
+    """At most ``points`` raw samples of one point between start and end, picked by :func:`lttb`.
+
+    Rows are streamed from the point index in chunks, never loaded whole.
+    """
+    rows = (
+        Sample.objects
+        .filter(device_id=device_id, source=source, address=address, ts__gte=start, ts__lt=end)
+        .order_by('ts')
+        .values_list('ts', 'value')
+    )
+    return lttb(rows.iterator(chunk_size=5000), start, end, points)
@@ -0,0 +1,125 @@
+import random
+import time
+from typing import Hashable
+
+
+class _Health:
+    __slots__ = ('state', 'failures', 'backoff', 'retry_at', 'error')
+
+    def __init__(self):
+        self.state = 'up'
+        self.failures = 0
+        self.backoff = 0.0
+        self.retry_at = 0.0
+        self.error = ''
+
+
+class CircuitBreaker:
+    """Per-device health with exponential backoff and a half-open probe.
+
+    A device is marked down after ``threshold`` consecutive failed polls.
+    While down it is not polled at all; once its backoff expires a single
+    probe poll is let through (other scan classes stay blocked). A failed
+    probe doubles the backoff, up to ``max_backoff``, with some jitter so that
+    devices behind the same dead network do not all retry together. A good
+    poll brings the device back up.
+
+    :meth:`failure` and :meth:`success` return True only on an up/down
+    transition, so callers can record one status row per outage instead of
+    one per poll.
+    """
+
+    def __init__(self, threshold: int = 3, base_backoff: float = 1.0, max_backoff: float = 300.0):
+        self.threshold = max(1, threshold)
+        self.base_backoff = base_backoff
+        self.max_backoff = max(base_backoff, max_backoff)
+        self._health: dict[Hashable, _Health] = {}
+
+    def state(self, key: Hashable) -> str:
+        h = self._health.get(key)
+        return h.state if h else 'up'
+
+    def retry_in(self, key: Hashable) -> float:
+        h = self._health.get(key)
+        return max(0.0, h.retry_at - time.monotonic()) if h else 0.0
+
+    def allow(self, key: Hashable) -> bool:
+        h = self._health.get(key)
+        if h is None or h.state == 'up':
+            return True
+        if h.state == 'down' and time.monotonic() >= h.retry_at:
+            h.state = 'probing'
+            return True
+        return False
+
+    def success(self, key: Hashable) -> bool:
+        h = self._health.pop(key, None)
+        return h is not None and h.state != 'up'
+
+    def failure(self, key: Hashable, error: str = '') -> bool:
+        h = self._health.get(key)
+        if h is None:
+            h = self._health[key] = _Health()
+        h.failures += 1
+        h.error = error
+        if h.state == 'up' and h.failures < self.threshold:
+            return False
+        opened = h.state == 'up'
+        h.backoff = self.base_backoff if opened else min(self.max_backoff, h.backoff * 2)
+        h.state = 'down'
+        h.retry_at = time.monotonic() + h.backoff * random.uniform(0.9, 1.1)
+        return opened
+
+    def forget(self, key: Hashable):
+        self._health.pop(key, None)
+
+
+class RequestTiming:
+    """Request timeout and retry budget for one device, from its measured round trips.
+
+    Keeps a smoothed RTT and RTT variance the way TCP does (Jacobson/Karels,
+    RFC 6298) and times requests out after ``srtt + 4 * rttvar``, clamped to
+    ``[min_timeout, max_timeout]``. Each timeout doubles it until a response
+    is measured again. Retries fill whatever of the poll interval the timeout
+    leaves, up to ``max_retries``, so slow links get one long try and fast
+    links several short ones. ``timeout`` and ``retries`` override the
+    adaptive values when set.
+    """
+
+    __slots__ = ('srtt', 'rttvar', 'rto', 'min_timeout', 'max_timeout', 'max_retries',
+                 'fixed_timeout', 'fixed_retries')
+
+    def __init__(self, initial: float = 3.0, min_timeout: float = 0.05, max_timeout: float = 10.0,
+                 max_retries: int = 2):
+        self.srtt: float | None = None
+        self.rttvar = 0.0
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.max_retries = max_retries
+        self.rto = min(max(initial, min_timeout), max_timeout)
+        self.fixed_timeout: float | None = None
+        self.fixed_retries: int | None = None
+
+    def configure(self, timeout: float | None = None, retries: int | None = None):
+        self.fixed_timeout = timeout
+        self.fixed_retries = retries
+
+    @property
+    def timeout(self) -> float:
+        return self.fixed_timeout if self.fixed_timeout is not None else self.rto
+
+    def retries(self, budget: float) -> int:
+        if self.fixed_retries is not None:
+            return max(0, self.fixed_retries)
+        return max(0, min(self.max_retries, int(budget / self.timeout) - 1))
+
+    def observe(self, rtt: float):
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rto = min(max(self.srtt + 4 * self.rttvar, self.min_timeout), self.max_timeout)
+
+    def timed_out(self):
+        self.rto = min(self.rto * 2, self.max_timeout)
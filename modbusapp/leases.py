@@ -0,0 +1,78 @@
+import math
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db.models import DateTimeField, ExpressionWrapper
+from django.db.models.functions import Now
+from .models import DeviceLease, PollerNode
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _db_now_plus(seconds: float):
+    # Use the database clock so replicas with skewed clocks agree on expiry
+    return ExpressionWrapper(Now() + timedelta(seconds=seconds), output_field=DateTimeField())
+
+
+class DeviceLeaseManager:
+    """Share devices between poller replicas through the DeviceLease table.
+
+    Each call to :meth:`heartbeat` registers this replica as alive, renews the
+    leases it holds, gives back any above its fair share (devices divided by
+    live replicas) and claims free or expired leases up to that share. Claims
+    are conditional UPDATEs, so two replicas can never own the same device.
+    A replica that stops heartbeating loses its devices after ``ttl`` seconds.
+
+    Locally a lease is trusted only until ``ttl`` after the heartbeat that
+    last confirmed it, so a replica cut off from the database stops polling
+    before anyone else can take its devices over.
+    """
+
+    def __init__(self, node_name: str, ttl: float = 6.0):
+        self.node_name = node_name
+        self.ttl = ttl
+        self.owned: set[int] = set()
+        self._valid_until = 0.0
+
+    def holds(self, device_id: int) -> bool:
+        return device_id in self.owned and time.monotonic() < self._valid_until
+
+    def heartbeat(self, device_ids) -> set[int]:
+        started = time.monotonic()
+        ids = set(device_ids)
+        PollerNode.objects.update_or_create(name=self.node_name, defaults={'last_seen': Now()})
+        PollerNode.objects.filter(last_seen__lt=_db_now_plus(-10 * self.ttl)).delete()
+        live = max(1, PollerNode.objects.filter(last_seen__gte=_db_now_plus(-self.ttl)).count())
+        fair = math.ceil(len(ids) / live)
+
+        DeviceLease.objects.filter(owner=self.node_name).exclude(device_id__in=ids).update(owner='', expires_at=_EPOCH)
+        DeviceLease.objects.filter(owner=self.node_name, device_id__in=ids).update(expires_at=_db_now_plus(self.ttl))
+        mine = set(DeviceLease.objects.filter(owner=self.node_name, device_id__in=ids).values_list('device_id', flat=True))
+
+        if len(mine) > fair:
+            excess = sorted(mine)[fair:]
+            DeviceLease.objects.filter(owner=self.node_name, device_id__in=excess).update(owner='', expires_at=_EPOCH)
+            mine.difference_update(excess)
+        elif len(mine) < fair:
+            known = set(DeviceLease.objects.filter(device_id__in=ids).values_list('device_id', flat=True))
+            DeviceLease.objects.bulk_create(
+                [DeviceLease(device_id=did, owner='', expires_at=_EPOCH) for did in ids - known],
+                ignore_conflicts=True,
+            )
+            free = DeviceLease.objects.filter(device_id__in=ids, expires_at__lt=Now()).order_by('device_id')
+            for did in list(free.values_list('device_id', flat=True)):
+                if len(mine) >= fair:
+                    break
+                claimed = DeviceLease.objects.filter(device_id=did, expires_at__lt=Now()).update(
+                    owner=self.node_name, expires_at=_db_now_plus(self.ttl))
+                if claimed:
+                    mine.add(did)
+
+        self.owned = mine
+        self._valid_until = started + self.ttl
+        return mine
+
+    def release(self):
+        DeviceLease.objects.filter(owner=self.node_name).update(owner='', expires_at=_EPOCH)
+        PollerNode.objects.filter(name=self.node_name).delete()
+        self.owned = set()
+        self._valid_until = 0.0
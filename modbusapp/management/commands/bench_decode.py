@@ -0,0 +1,70 @@
+import random
+import struct
+import timeit
+from django.core.management.base import BaseCommand, CommandError
+from modbusapp.modbus_client import decode_holding_registers
+
+DATATYPES = ('u16', 's16', 'u32', 's32', 'f32', 'u64', 's64', 'f64')
+ORDERS = (('big', 'big'), ('big', 'little'), ('little', 'big'), ('little', 'little'))
+
+
+def per_value_decode(regs, datatype, byte_order, word_order):
+    """The original one-value-at-a-time decoder, kept as the benchmark baseline."""
+    sizes = {
+        'u16': (1, 'H'), 's16': (1, 'h'),
+        'u32': (2, 'I'), 's32': (2, 'i'), 'f32': (2, 'f'),
+        'u64': (4, 'Q'), 's64': (4, 'q'), 'f64': (4, 'd'),
+    }
+    words_per, fmt = sizes[datatype]
+    endian = '>' if byte_order == 'big' else '<'
+    out = []
+    total = len(regs) - (len(regs) % words_per)
+    for i in range(0, total, words_per):
+        chunk = regs[i:i + words_per]
+        if words_per > 1 and word_order == 'little':
+            chunk = list(reversed(chunk))
+        b = bytearray()
+        for r in chunk:
+            b.extend(int(r & 0xFFFF).to_bytes(2, byteorder=byte_order, signed=False))
+        out.append(struct.unpack(endian + fmt, bytes(b))[0])
+    return out
+
+
+def same(a, b):
+    return len(a) == len(b) and all(x == y or (x != x and y != y) for x, y in zip(a, b))
+
+
+class Command(BaseCommand):
+    help = "Check the bulk holding-register decoder against the per-value baseline and time both."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--registers', type=int, nargs='+', default=[8, 125, 1000, 10000],
+                            help='Block sizes (registers) to time')
+        parser.add_argument('--seconds', type=float, default=0.2, help='Approximate time per measurement')
+
+    def handle(self, *args, **opts):
+        rng = random.Random(0)
+
+        # Correctness first: every datatype and order on odd and even lengths
+        for n in (1, 7, 64, 1001):
+            regs = [rng.randrange(65536) for _ in range(n)]
+            for dt in DATATYPES:
+                for bo, wo in ORDERS:
+                    if not same(per_value_decode(regs, dt, bo, wo), decode_holding_registers(regs, dt, bo, wo)):
+                        raise CommandError(f"Mismatch: {dt} byte={bo} word={wo} n={n}")
+        self.stdout.write(self.style.SUCCESS("Results identical for all datatypes and orders"))
+
+        self.stdout.write(f"{'datatype':<9}{'registers':>10}{'baseline us':>14}{'bulk us':>12}{'speedup':>10}")
+        for n in opts['registers']:
+            regs = [rng.randrange(65536) for _ in range(n)]
+            for dt in ('u16', 'f32', 'f64'):
+                base = self.time_call(lambda: per_value_decode(regs, dt, 'big', 'little'), opts['seconds'])
+                bulk = self.time_call(lambda: decode_holding_registers(regs, dt, 'big', 'little'), opts['seconds'])
+                self.stdout.write(f"{dt:<9}{n:>10}{base * 1e6:>14.1f}{bulk * 1e6:>12.1f}{base / bulk:>9.1f}x")
+
+    @staticmethod
+    def time_call(fn, seconds: float) -> float:
+        timer = timeit.Timer(fn)
+        number, elapsed = timer.autorange()
+        repeat = max(1, int(seconds / max(elapsed, 1e-9)))
+        return min(timer.repeat(repeat=min(repeat, 5), number=number)) / number
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from modbusapp.partitions import INTERVALS, TABLES, convert, create_ahead, expire, is_partitioned
+
+
+class Command(BaseCommand):
+    help = 'Maintain time partitions of the PollResult and Sample tables (Postgres only).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tables', default=','.join(TABLES),
+                            help=f"Comma-separated tables to manage (default: {','.join(TABLES)})")
+        parser.add_argument('--convert', action='store_true',
+                            help='Partition tables that are still plain; stop the pollers while this runs')
+        parser.add_argument('--interval', choices=INTERVALS, default='day', help='Partition width')
+        parser.add_argument('--ahead', type=int, default=7, help='Keep this many future partitions ready')
+        parser.add_argument('--retain-days', type=float, default=0,
+                            help='Remove partitions wholly older than this many days (0 keeps them)')
+        parser.add_argument('--detach-only', action='store_true',
+                            help='Detach expired partitions but keep them as tables, e.g. for archiving')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Partitioning needs PostgreSQL")
+        keys = [k.strip() for k in options['tables'].split(',') if k.strip()]
+        unknown = set(keys) - set(TABLES)
+        if unknown:
+            raise CommandError(f"Unknown table(s): {', '.join(sorted(unknown))}")
+        for key in keys:
+            table = TABLES[key][0]._meta.db_table
+            if not is_partitioned(table):
+                if not options['convert']:
+                    self.stderr.write(self.style.WARNING(f"{table} is not partitioned; run with --convert first"))
+                    continue
+                self.stdout.write(convert(key, options['interval']))
+            created = create_ahead(key, options['interval'], options['ahead'])
+            if created:
+                self.stdout.write(self.style.SUCCESS(f"Created {', '.join(created)}"))
+            if options['retain_days'] > 0:
+                removed = expire(key, options['retain_days'], drop=not options['detach_only'])
+                if removed:
+                    verb = 'Detached' if options['detach_only'] else 'Dropped'
+                    self.stdout.write(self.style.SUCCESS(f"{verb} {', '.join(removed)}"))
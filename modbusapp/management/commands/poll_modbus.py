@@ -1,16 +1,34 @@
 import asyncio
+import contextlib
+import os
+import signal
+import socket
+import subprocess
+import sys
 import time
-from django.core.management.base import BaseCommand
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
 from asgiref.sync import sync_to_async
 from modbusapp.models import ModbusDevice, PollResult
-from modbusapp.modbus_client import (
-    client_for,
-    read_all,
-    decode_holding_registers,
-    aclient_for,
-    aread_all,
-    AsyncModbusTcpClient,
-)
+from modbusapp.config_cache import DeviceConfigCache
+from modbusapp.health import CircuitBreaker, RequestTiming
+from modbusapp.leases import DeviceLeaseManager
+from modbusapp.metrics import REGISTRY, serve as serve_metrics
+from modbusapp.poll_plan import PollPlan, merge_latest
+from modbusapp.profiling import PollProfile, watch_event_loop
+from modbusapp.report_by_exception import ExceptionFilter
+from modbusapp.result_writer import PollResultWriter
+from modbusapp.scheduler import PollScheduler
+from modbusapp.spool import SpoolWriter
+from modbusapp.modbus_client import AsyncClientPool
+
+POLL_SECONDS = REGISTRY.histogram(
+    'modbus_poll_seconds', 'Whole device polls: connection checkout, reads and decoding.', ('device',))
+POLLS = REGISTRY.counter('modbus_polls_total', 'Device polls by outcome.', ('device', 'result'))
+SKIPPED = REGISTRY.counter(
+    'modbus_poll_skipped_total', 'Poll cycles skipped because the previous poll was still running.', ('target',))
 
 
 class Command(BaseCommand):
@@ -19,21 +37,106 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--once', action='store_true', help='Poll once and exit')
         parser.add_argument('--interval', type=float, default=1.0, help='Default interval seconds when not set per device')
-        parser.add_argument('--refresh', type=float, default=5.0, help='Seconds between checking for device list changes')
+        parser.add_argument('--refresh', type=float, default=5.0, help='Seconds between config version checks when LISTEN/NOTIFY is unavailable')
+        parser.add_argument('--conn-idle', type=float, default=60.0, help='Close pooled device connections unused for this many seconds')
+        parser.add_argument('--breaker-threshold', type=int, default=3,
+                            help='Consecutive failed polls before a device is marked down and backed off')
+        parser.add_argument('--backoff-max', type=float, default=300.0,
+                            help='Longest wait in seconds between probes of a device that is down')
+        parser.add_argument('--workers', type=int, default=1, help='Split devices across this many poller processes')
+        parser.add_argument('--shard', default='', help='Poll only shard I of N ("I/N"); set by --workers for child processes')
+        parser.add_argument('--batch-size', type=int, default=500, help='Insert poll results in batches of up to this many rows')
+        parser.add_argument('--flush-interval', type=float, default=1.0, help='Max seconds a poll result waits before its batch is inserted')
+        parser.add_argument('--max-pending', type=int, default=10000, help='Max queued poll results before polling waits for the database')
+        parser.add_argument('--spool-dir', default=os.environ.get('POLL_SPOOL_DIR', ''),
+                            help='Spool poll results to this directory and drain them into the database in the background')
+        parser.add_argument('--keep-arrays', action='store_true',
+                            default=os.environ.get('POLL_KEEP_ARRAYS', '') not in ('', '0'),
+                            help='Also keep every poll\'s full value arrays in PollResult, not just card point samples')
+        parser.add_argument('--lease', action='store_true', help='Share devices with other poller replicas through database leases')
+        parser.add_argument('--lease-ttl', type=float, default=6.0, help='Seconds before a silent replica loses its device leases')
+        parser.add_argument('--node-name', default='', help='Replica name for leases (default: hostname-pid)')
+        parser.add_argument('--metrics-port', type=int, default=int(os.environ.get('POLL_METRICS_PORT', 0)),
+                            help='Serve Prometheus metrics on this port (0 disables); with --workers, child I serves on this port + I')
+        parser.add_argument('--metrics-host', default='127.0.0.1', help='Address the metrics endpoint listens on')
+        parser.add_argument('--profile', default='', metavar='PATH',
+                            help='Profile the poller and write a report to PATH (raw stats to PATH.prof), then exit')
+        parser.add_argument('--profile-seconds', type=float, default=60.0, help='How long a --profile run lasts')
+        parser.add_argument('--profile-cycles', type=int, default=0,
+                            help='End a --profile run after this many device polls, if sooner')
 
     def handle(self, *args, **options):
+        if options['workers'] > 1:
+            if options['profile']:
+                raise CommandError("--profile profiles one process; run it without --workers")
+            return self.supervise(options)
         single = options['once']
         default_interval = options['interval']
         refresh_secs = options['refresh']
+        shard_index, shard_count = self.parse_shard(options['shard'])
+        pool = AsyncClientPool(max_idle=options['conn_idle'])
+        writer: PollResultWriter | SpoolWriter | None = None
+        cache = DeviceConfigCache(check_interval=max(0.5, float(refresh_secs)))
+        rbe = ExceptionFilter()
+        plans: dict[tuple[int, int | None], PollPlan] = {}
+        # A single --once pass records every failure
+        breaker = CircuitBreaker(
+            threshold=1 if single else options['breaker_threshold'],
+            max_backoff=options['backoff_max'],
+        )
+        timings: dict[int, RequestTiming] = {}
+        # Latest values per device, merged across scan classes
+        latest: dict[int, tuple[ModbusDevice, dict]] = {}
+        # Interval of each ('align', group) scheduler key, as last scheduled
+        scheduler_intervals: dict[tuple, float] = {}
+        leases = None
+        if options['lease']:
+            node_name = options['node_name'] or f"{socket.gethostname()}-{os.getpid()}"
+            leases = DeviceLeaseManager(node_name, ttl=options['lease_ttl'])
 
-        async def fetch_devices():
-            return await sync_to_async(lambda: list(ModbusDevice.objects.filter(enabled=True)[:8]))()
+        def poll_units() -> list[list[ModbusDevice]]:
+            # An align group is sharded and leased as one unit, so a single
+            # process polls all of its members together
+            units: dict = {}
+            for d in cache.all():
+                units.setdefault(('align', d.align_group) if d.align_group else d.id, []).append(d)
+            return list(units.values())
 
-        async def save_result(device, data=None, ok=True, error=""):
+        def assigned_devices():
+            units = poll_units()
+            if leases is not None:
+                # The lease on a unit's lowest device id covers the whole unit
+                return [d for unit in units if leases.holds(unit[0].id) for d in unit]
+            # Every shard sees the same ordered list, so a device added or removed
+            # rebalances all shards on their next refresh without coordination
+            return [d for unit in units[shard_index::shard_count] for d in unit]
+
+        async def renew_leases():
+            await sync_to_async(leases.heartbeat)([unit[0].id for unit in poll_units()])
+
+        async def lease_keeper():
+            while True:
+                await asyncio.sleep(leases.ttl / 3)
+                try:
+                    await renew_leases()
+                except Exception as e:
+                    # Leases lapse locally after ttl, so polling stops on its own
+                    self.stderr.write(self.style.ERROR(f"Lease heartbeat failed: {e}"))
+
+        def make_result(device, data=None, ok=True, error="", cycle=None) -> PollResult:
+            """Row for one poll. When report-by-exception drops it from history,
+            ``row.history`` is False and it only refreshes DeviceLatest.
+
+            ``cycle`` is the (created_at, cycle_id) of an aligned scan cycle; its
+            rows are always kept so every cycle is a complete snapshot.
+            """
             if data is None:
                 data = {'discrete_inputs': [], 'input_registers': [], 'holding_registers': [], 'coils': []}
-            await sync_to_async(PollResult.objects.create)(
+            created_at, cycle_id = cycle or (timezone.now(), None)
+            row = PollResult(
                 device=device,
+                created_at=created_at,
+                cycle_id=cycle_id,
                 discrete_inputs=data.get('discrete_inputs', []),
                 input_registers=data.get('input_registers', []),
                 holding_registers=data.get('holding_registers', []),
@@ -41,99 +144,395 @@ class Command(BaseCommand):
                 ok=ok,
                 error=error,
             )
+            if cycle is None and device.storage_mode == 'exception':
+                row.history = rbe.should_store(device, data, ok=ok, error=error)
+            return row
+
+        async def save_result(device, data=None, ok=True, error=""):
+            await writer.put(make_result(device, data, ok=ok, error=error))
+
+        def plan_for_device(d: ModbusDevice, scan_class_id: int | None = None) -> PollPlan:
+            # Recompiled whenever a config reload hands us a new device object
+            plan = plans.get((d.id, scan_class_id))
+            if plan is None or plan.device is not d:
+                plan = plans[d.id, scan_class_id] = PollPlan(d, scan_class_id)
+            return plan
+
+        def device_interval(d: ModbusDevice) -> float:
+            return max(0.1, (d.poll_interval_ms or int(default_interval * 1000)) / 1000.0)
+
+        def device_schedule(d: ModbusDevice) -> dict[int | None, float]:
+            """Interval in seconds for the device itself (None) and each scan class it uses."""
+            intervals = {None: device_interval(d)}
+            classes = d.scan_classes()
+            for cid, tables in d.scan_ranges().items():
+                if cid is not None and any(tables.values()):
+                    intervals[cid] = max(0.1, classes[cid].interval_ms / 1000.0)
+            return intervals
+
+        def timing_for(d: ModbusDevice) -> RequestTiming:
+            # RTT history survives config reloads; only the overrides are refreshed
+            timing = timings.get(d.id)
+            if timing is None:
+                timing = timings[d.id] = RequestTiming(initial=pool.timeout)
+            timing.configure(
+                d.timeout_ms / 1000.0 if d.timeout_ms else None,
+                d.retries,
+            )
+            return timing
 
-        async def poll_device_once(d: ModbusDevice):
+        async def poll_device_once(d: ModbusDevice, scan_class_ids=(None,), cycle=None) -> PollResult | None:
+            """Poll ``d`` and store the result. In an aligned ``cycle`` the row is
+            returned for the caller to store with the rest of the cycle instead."""
+            # Devices marked down are left alone until their next probe is due
+            if not breaker.allow(d.id):
+                return None
+            timing = timing_for(d)
+            # Retries must not run into the next poll
+            retries = timing.retries(device_interval(d))
+            started = time.monotonic()
             try:
-                if AsyncModbusTcpClient is not None:
-                    async with aclient_for(d.host, d.port) as c:
-                        data = await aread_all(
-                            c, d.unit_id,
-                            d.di_start, d.di_count,
-                            d.ir_start, d.ir_count,
-                            d.hr_start, d.hr_count,
-                            d.coil_start, d.coil_count,
-                        )
-                else:
-                    # Fallback: run sync read in a thread
-                    def sync_read():
-                        with client_for(d.host, d.port) as c:
-                            return read_all(
-                                c, d.unit_id,
-                                d.di_start, d.di_count,
-                                d.ir_start, d.ir_count,
-                                d.hr_start, d.hr_count,
-                                d.coil_start, d.coil_count,
-                            )
-                    data = await asyncio.to_thread(sync_read)
-
-                if data.get('holding_registers'):
-                    decoded = decode_holding_registers(
-                        data['holding_registers'],
-                        datatype=d.hr_datatype,
-                        byte_order=d.hr_byte_order,
-                        word_order=d.hr_word_order,
-                    )
-                    # Optional rounding for floats
-                    if d.hr_datatype in ("f32", "f64") and isinstance(decoded, list):
-                        try:
-                            places = max(0, int(getattr(d, 'hr_decimals', 2)))
-                        except Exception:
-                            places = 2
-                        data['holding_registers'] = [
-                            (round(v, places) if isinstance(v, float) else v)
-                            for v in decoded
-                        ]
-                    else:
-                        data['holding_registers'] = decoded
-                await save_result(d, data=data, ok=True)
-                self.stdout.write(self.style.SUCCESS(f"Polled {d}"))
+                async with pool.acquire(d.host, d.port) as c:
+                    data = {}
+                    for cid in scan_class_ids:
+                        data = merge_latest(data, await plan_for_device(d, cid).execute(c, timing, retries))
             except Exception as e:
-                await save_result(d, ok=False, error=str(e))
-                self.stderr.write(self.style.ERROR(f"Error polling {d}: {e}"))
+                POLL_SECONDS.observe(time.monotonic() - started, d.name)
+                POLLS.inc(d.name, 'error')
+                error = str(e) or type(e).__name__
+                row = None
+                if breaker.failure(d.id, error):
+                    # One row marks the start of an outage; none are written while it lasts
+                    row = make_result(d, ok=False, error=error, cycle=cycle)
+                    self.stderr.write(self.style.ERROR(
+                        f"{d} is down: {error}; retrying in {breaker.retry_in(d.id):.0f}s"))
+                elif breaker.state(d.id) == 'down':
+                    self.stderr.write(self.style.WARNING(
+                        f"{d} still down: {error}; next probe in {breaker.retry_in(d.id):.0f}s"))
+                else:
+                    self.stderr.write(self.style.ERROR(f"Error polling {d}: {error}"))
+                if row is not None and cycle is None:
+                    await writer.put(row)
+                    return None
+                return row
+            POLL_SECONDS.observe(time.monotonic() - started, d.name)
+            POLLS.inc(d.name, 'ok')
+            if breaker.success(d.id):
+                self.stdout.write(self.style.SUCCESS(f"{d} is back up"))
+            # Scan classes refresh their own points; the rest keep their latest values
+            prev = latest.get(d.id)
+            if prev is not None and prev[0] is d:
+                data = merge_latest(prev[1], data)
+            latest[d.id] = (d, data)
+            if cycle is not None:
+                return make_result(d, data=data, cycle=cycle)
+            await save_result(d, data=data, ok=True)
+            self.stdout.write(self.style.SUCCESS(f"Polled {d}"))
+            return None
 
-        async def run_once():
-            devices = await fetch_devices()
-            await asyncio.gather(*(poll_device_once(d) for d in devices))
+        def align_groups(devices) -> dict[str, list[ModbusDevice]]:
+            groups: dict[str, list[ModbusDevice]] = {}
+            for d in devices:
+                if d.align_group:
+                    groups.setdefault(d.align_group, []).append(d)
+            return groups
 
-        async def device_worker(device_id: int):
-            # Initial slight stagger to avoid thundering herd
-            await asyncio.sleep((device_id % 10) * 0.05)
-            while True:
-                # Always fetch the latest device config each cycle
+        async def poll_cycle(group: str, members: list[ModbusDevice], interval: float):
+            """Poll an align group on one tick and store its rows as one batch.
+
+            Every row of the cycle gets the tick as ``created_at`` and its Unix
+            time in ms as ``cycle_id``, so the group reads as one snapshot.
+            """
+            tick = round(time.time() / interval) * interval
+            cycle = (datetime.fromtimestamp(tick, dt_timezone.utc), round(tick * 1000))
+            started = time.monotonic()
+            finished = []
+
+            async def member(d):
                 try:
-                    d = await sync_to_async(ModbusDevice.objects.get)(pk=device_id)
-                except ModbusDevice.DoesNotExist:
-                    break
-                if not d.enabled:
-                    break
-                interval = max(0.1, (d.poll_interval_ms or int(default_interval * 1000)) / 1000.0)
-                start = time.time()
-                await poll_device_once(d)
-                elapsed = time.time() - start
-                await asyncio.sleep(max(0.0, interval - elapsed))
+                    return await poll_device_once(d, tuple(device_schedule(d)), cycle=cycle)
+                finally:
+                    finished.append(time.monotonic())
+
+            rows = [r for r in await asyncio.gather(*(member(d) for d in members)) if r is not None]
+            if rows:
+                await writer.put_many(rows)
+            ok = sum(r.ok for r in rows)
+            # Spread: how far apart the member reads completed within the cycle
+            self.stdout.write(self.style.SUCCESS(
+                f"Cycle {group} @{cycle[1]}: {ok}/{len(members)} devices, "
+                f"spread {(max(finished) - min(finished)) * 1000:.1f} ms, "
+                f"took {(time.monotonic() - started) * 1000:.1f} ms"))
+
+        def configure_gateways(devices):
+            # Devices sharing host:port are multiplexed over one pooled connection.
+            # A device that takes concurrent reads can have that many in flight on it.
+            gateways: dict[tuple[str, int], list[ModbusDevice]] = {}
+            for d in devices:
+                gateways.setdefault((d.host, d.port), []).append(d)
+            for (host, port), members in gateways.items():
+                depth = min(max(1, m.pipeline_depth, m.max_concurrent_reads) for m in members)
+                pool.configure_gateway(host, port, depth)
+
+        async def run_once():
+            if leases is not None:
+                await renew_leases()
+            devices = assigned_devices()
+            configure_gateways(devices)
+            groups = align_groups(devices)
+            await asyncio.gather(
+                *(poll_device_once(d, tuple(device_schedule(d))) for d in devices if not d.align_group),
+                *(poll_cycle(g, members, min(map(device_interval, members))) for g, members in groups.items()),
+            )
+
+        async def poll_scheduled(key: tuple):
+            if key[0] == 'align':
+                # Members re-read from the cache every tick, like single devices
+                group, interval = key[1], scheduler_intervals.get(key)
+                members = align_groups(assigned_devices()).get(group)
+                if members and interval:
+                    await poll_cycle(group, members, interval)
+                return
+            # Latest config from the cache; gone once deleted, disabled or leased away
+            device_id, scan_class_id = key
+            d = cache.get(device_id)
+            if d is None or (leases is not None and not leases.holds(device_id)):
+                return
+            await poll_device_once(d, (scan_class_id,))
+
+        def schedule_target(key: tuple) -> str:
+            if key[0] == 'align':
+                return f"align:{key[1]}"
+            d = cache.get(key[0])
+            name = d.name if d is not None else str(key[0])
+            return name if key[1] is None else f"{name}/{key[1]}"
+
+        def on_skip(key: tuple, cycles: int):
+            SKIPPED.inc(schedule_target(key), amount=cycles)
+            if key[0] == 'align':
+                self.stderr.write(self.style.WARNING(
+                    f"Skipped {cycles} cycle(s) for align group {key[1]}: previous cycle still running"))
+                return
+            d = cache.get(key[0])
+            what = f"{d or key[0]}" + (f" scan class {key[1]}" if key[1] is not None else "")
+            self.stderr.write(self.style.WARNING(f"Skipped {cycles} cycle(s) for {what}: previous poll still running"))
+
+        def register_collectors(scheduler: PollScheduler | None):
+            # Read at scrape time, so they cost nothing between scrapes
+            REGISTRY.gauge('poll_writer_pending', 'Poll results (or spool segments) waiting for the database.',
+                           collect=lambda: {(): writer.pending})
+            REGISTRY.gauge('modbus_devices_down', 'Devices currently backed off by the circuit breaker.',
+                           collect=lambda: {(): sum(breaker.state(d.id) != 'up' for d in assigned_devices())})
+            if scheduler is None:
+                return
+
+            def stats(attr):
+                out = {}
+                for key in list(scheduler.keys()):
+                    st = scheduler.stats(key)
+                    if st is not None:
+                        out[(schedule_target(key),)] = getattr(st, attr)
+                return out
+
+            REGISTRY.gauge('modbus_poll_overruns_total', 'Polls that finished after their next deadline.',
+                           ('target',), collect=lambda: stats('overruns'), kind='counter')
+            REGISTRY.gauge('modbus_poll_lateness_seconds', 'How late the last poll started after its deadline.',
+                           ('target',), collect=lambda: stats('last_lateness'))
+            REGISTRY.gauge('modbus_poll_max_lateness_seconds', 'Latest start after a deadline since the poller started.',
+                           ('target',), collect=lambda: stats('max_lateness'))
 
         async def run_forever():
-            import contextlib
-            tasks: dict[int, asyncio.Task] = {}
-            while True:
-                devices = await fetch_devices()
-                current_ids = {d.id for d in devices}
-                # Start new tasks
-                for did in current_ids - set(tasks.keys()):
-                    tasks[did] = asyncio.create_task(device_worker(did))
-                # Cancel tasks for removed/disabled devices
-                for did in list(tasks.keys() - current_ids):
-                    t = tasks.pop(did)
+            scheduler = PollScheduler(poll_scheduled, on_skip=on_skip)
+            register_collectors(scheduler)
+            tasks = [asyncio.create_task(scheduler.run())]
+            # Without leases the device set only changes with the config
+            refresh = None
+            if leases is not None:
+                await renew_leases()
+                tasks.append(asyncio.create_task(lease_keeper()))
+                # Pick up devices taken over from a dead replica promptly
+                refresh = max(0.5, leases.ttl / 3)
+            try:
+                while True:
+                    devices = assigned_devices()
+                    configure_gateways(devices)
+                    current = set()
+                    for d in devices:
+                        # Grouped devices are polled by their group's cycle, scan classes included
+                        if d.align_group:
+                            continue
+                        for cid, interval in device_schedule(d).items():
+                            scheduler.schedule((d.id, cid), interval)
+                            current.add((d.id, cid))
+                    scheduler_intervals.clear()
+                    for group, members in align_groups(devices).items():
+                        key = ('align', group)
+                        # Cycles tick on wall-clock multiples of the fastest member's interval
+                        scheduler_intervals[key] = min(map(device_interval, members))
+                        scheduler.schedule(key, scheduler_intervals[key], aligned=True)
+                        current.add(key)
+                    for key in list(scheduler.keys() - current):
+                        scheduler.remove(key)
+                        plans.pop(key, None)
+                    current_ids = {d.id for d in devices}
+                    for key in [k for k in plans if k[0] not in current_ids]:
+                        plans.pop(key)
+                    for did in list(latest.keys() - current_ids):
+                        gone, _ = latest.pop(did)
+                        rbe.forget(did)
+                        breaker.forget(did)
+                        timings.pop(did, None)
+                        REGISTRY.forget('device', gone.name)
+                    await cache.wait_changed(timeout=refresh)
+            finally:
+                for t in tasks:
                     t.cancel()
-                    with contextlib.suppress(asyncio.CancelledError):
-                        await t
-                await asyncio.sleep(max(0.5, float(refresh_secs)))
-
-        if single:
-            asyncio.run(run_once())
-        else:
-            import contextlib
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        async def run(main):
+            """Run main until it returns or SIGINT/SIGTERM, then flush and release."""
+            nonlocal writer
+            if options['spool_dir']:
+                writer = SpoolWriter(
+                    options['spool_dir'],
+                    batch_size=options['batch_size'],
+                    segment_seconds=options['flush_interval'],
+                    arrays=options['keep_arrays'],
+                )
+            else:
+                writer = PollResultWriter(
+                    batch_size=options['batch_size'],
+                    flush_interval=options['flush_interval'],
+                    max_pending=options['max_pending'],
+                    arrays=options['keep_arrays'],
+                )
+            writer.start()
+            metrics_server = None
+            if options['metrics_port']:
+                if single:
+                    register_collectors(None)
+                metrics_server = await serve_metrics(options['metrics_host'], options['metrics_port'])
+            profile = None
+            if options['profile']:
+                profile = PollProfile(options['profile'], options['profile_seconds'], options['profile_cycles'])
+            background = []
+            if profile is not None or metrics_server is not None:
+                # Finer lag samples while profiling
+                background.append(asyncio.create_task(watch_event_loop(0.05 if profile else 0.5)))
+            loop = asyncio.get_running_loop()
+            stop = asyncio.Event()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stop.set)
+            await cache.start()
+            main_task = asyncio.create_task(main())
+            stop_task = asyncio.create_task(stop.wait())
+            waiting = {main_task, stop_task}
+            if profile is not None:
+                profile.start()
+                # Ends the run once its duration or poll count is reached
+                profile_task = asyncio.create_task(profile.wait(POLLS.total))
+                background.append(profile_task)
+                waiting.add(profile_task)
             try:
-                asyncio.run(run_forever())
-            except KeyboardInterrupt:
+                await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                main_task.cancel()
+                stop_task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await main_task
+                for t in background:
+                    t.cancel()
+                await asyncio.gather(*background, return_exceptions=True)
+                if profile is not None:
+                    profile.stop()
+                if metrics_server is not None:
+                    metrics_server.close()
+                await cache.close()
+                await pool.close()
+                await writer.close()
+                if leases is not None:
+                    await sync_to_async(leases.release)()
+            if profile is not None:
+                profile.write(int(POLLS.total()), options)
+                self.stdout.write(f"Profile written to {profile.path} and {profile.path}.prof")
+            if stop.is_set():
                 self.stdout.write("Stopped")
+
+        asyncio.run(run(run_once if single else run_forever))
+
+    @staticmethod
+    def interrupt(signum, frame):
+        # Treat SIGTERM (docker stop, supervisor shutdown) like Ctrl-C so cleanup runs
+        raise KeyboardInterrupt
+
+    def parse_shard(self, value: str) -> tuple[int, int]:
+        if not value:
+            return 0, 1
+        try:
+            index, count = (int(x) for x in value.split('/', 1))
+        except ValueError:
+            raise CommandError(f"--shard must look like I/N, got {value!r}")
+        if count < 1 or not 0 <= index < count:
+            raise CommandError(f"--shard index must be in 0..{count - 1}")
+        return index, count
+
+    def supervise(self, options):
+        """Run one child poller per shard and restart any that exit."""
+        workers = options['workers']
+        base = [
+            sys.executable, '-m', 'django', 'poll_modbus',
+            '--interval', str(options['interval']),
+            '--refresh', str(options['refresh']),
+            '--conn-idle', str(options['conn_idle']),
+            '--breaker-threshold', str(options['breaker_threshold']),
+            '--backoff-max', str(options['backoff_max']),
+            '--batch-size', str(options['batch_size']),
+            '--flush-interval', str(options['flush_interval']),
+            '--max-pending', str(options['max_pending']),
+            '--metrics-host', options['metrics_host'],
+        ]
+        if options['once']:
+            base.append('--once')
+        if options['keep_arrays']:
+            base.append('--keep-arrays')
+        if options['lease']:
+            # Each child is a replica of its own and takes a fair share of the leases
+            base += ['--lease', '--lease-ttl', str(options['lease_ttl'])]
+
+        def spawn(i):
+            args = list(base)
+            if options['metrics_port']:
+                # One endpoint per child, on consecutive ports
+                args += ['--metrics-port', str(options['metrics_port'] + i)]
+            if options['spool_dir']:
+                # Children must not share segment files
+                args += ['--spool-dir', os.path.join(options['spool_dir'], f'w{i}')]
+            if options['lease']:
+                name = f"{options['node_name'] or socket.gethostname()}-w{i}"
+                return subprocess.Popen(args + ['--node-name', name], cwd=settings.BASE_DIR)
+            return subprocess.Popen(args + ['--shard', f'{i}/{workers}'], cwd=settings.BASE_DIR)
+
+        signal.signal(signal.SIGTERM, self.interrupt)
+        children = {i: spawn(i) for i in range(workers)}
+        self.stdout.write(f"Started {workers} poller workers")
+        try:
+            while children:
+                time.sleep(1.0)
+                for i, proc in list(children.items()):
+                    code = proc.poll()
+                    if code is None:
+                        continue
+                    if options['once']:
+                        children.pop(i)
+                        continue
+                    self.stderr.write(self.style.ERROR(f"Worker {i}/{workers} exited with {code}; restarting"))
+                    children[i] = spawn(i)
+        except KeyboardInterrupt:
+            for proc in children.values():
+                proc.terminate()
+            for proc in children.values():
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+            self.stdout.write("Stopped")
@@ -0,0 +1,56 @@
+import os
+import signal
+import time
+from django.core.management.base import BaseCommand
+from modbusapp.rollups import enforce_retention, roll_up
+
+
+def _env_days(name: str) -> float:
+    return float(os.environ.get(name, 0) or 0)
+
+
+class Command(BaseCommand):
+    help = 'Roll new card point samples up into 1-minute and 1-hour tiers and apply retention.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0.0,
+                            help='Repeat every this many seconds (default: run once and exit)')
+        parser.add_argument('--batch-size', type=int, default=50000, help='Samples read per rollup transaction')
+        parser.add_argument('--raw-days', type=float, default=_env_days('RETAIN_RAW_DAYS'),
+                            help='Delete samples and poll results older than this many days (0 keeps them)')
+        parser.add_argument('--minute-days', type=float, default=_env_days('RETAIN_MINUTE_DAYS'),
+                            help='Delete 1-minute rollups older than this many days (0 keeps them)')
+        parser.add_argument('--hour-days', type=float, default=_env_days('RETAIN_HOUR_DAYS'),
+                            help='Delete 1-hour rollups older than this many days (0 keeps them)')
+
+    def handle(self, *args, **options):
+        # Stop between runs on docker stop as on Ctrl-C; an interrupted transaction rolls back
+        signal.signal(signal.SIGTERM, self.interrupt)
+        try:
+            while True:
+                self.run_once(options)
+                if options['every'] <= 0:
+                    return
+                time.sleep(options['every'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped")
+
+    @staticmethod
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    def run_once(self, options):
+        started = time.monotonic()
+        total = 0
+        # Catch up in bounded transactions
+        while True:
+            n = roll_up(batch_size=options['batch_size'])
+            total += n
+            if n < options['batch_size']:
+                break
+        deleted = enforce_retention(options['raw_days'], options['minute_days'], options['hour_days'])
+        summary = ", ".join(f"{n} {kind}" for kind, n in deleted.items() if n)
+        self.stdout.write(
+            f"Rolled up {total} samples in {time.monotonic() - started:.2f}s"
+            + (f"; deleted {summary}" if summary else "")
+        )
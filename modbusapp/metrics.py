@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import math
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Seconds: sub-millisecond decodes up to request timeouts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> list[str]:
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def total(self) -> float:
+        return sum(list(self._values.values()))
+
+    def samples(self):
+        for labels, value in list(self._values.items()):
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+
+class Gauge(_Metric):
+    """Gauge set directly, or read from ``collect`` (returning {labels: value}) at scrape time."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help, labelnames=(), collect: Callable[[], dict] | None = None, kind: str | None = None):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+        self.collect = collect
+        # Scrape-time values that only ever grow are exposed as counters
+        if kind:
+            self.kind = kind
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def samples(self):
+        values = self.collect() if self.collect is not None else self._values
+        for labels, value in list(values.items()):
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; ``observe`` is one bisect and two additions."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def merged(self) -> tuple[list[int], float]:
+        """Per-bucket counts and sum over every label set."""
+        counts, total = [0] * (len(self.buckets) + 1), 0.0
+        for entry_counts, entry_total in list(self._values.values()):
+            counts = [a + b for a, b in zip(counts, entry_counts)]
+            total += entry_total
+        return counts, total
+
+    def samples(self):
+        bounds = self.buckets + (math.inf,)
+        for labels, (counts, total) in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}'
+
+
+class Registry:
+    """In-process metrics rendered in the Prometheus text exposition format.
+
+    Metrics are plain dicts updated from the event loop (or a request thread),
+    so recording costs a dict lookup and needs no locks or background work.
+    Registering a name twice returns the existing metric, so modules can
+    declare what they record at import time.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, cls, name, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = (), **kwargs) -> Gauge:
+        return self._register(Gauge, name, help, labelnames, **kwargs)
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def metrics(self) -> list[_Metric]:
+        return list(self._metrics.values())
+
+    def forget(self, label: str, value):
+        """Drop every label set whose ``label`` equals ``value``."""
+        for metric in self._metrics.values():
+            if label in metric.labelnames:
+                i = metric.labelnames.index(label)
+                for labels in [k for k in metric._values if k[i] == value]:
+                    metric._values.pop(labels, None)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                logger.exception("Collecting metric %s failed", metric.name)
+                continue
+            lines.extend(metric.header())
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+async def serve(host: str, port: int, registry: Registry = REGISTRY) -> asyncio.Server:
+    """Serve ``registry`` over plain HTTP at ``/metrics`` for Prometheus to scrape."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5.0)
+            # Headers are not needed; read up to the blank line so the client sees a clean close
+            while (await asyncio.wait_for(reader.readline(), timeout=5.0)) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request.decode('latin-1').split()
+            path = parts[1].split('?', 1)[0] if len(parts) > 1 else ''
+            if path in ('/', '/metrics'):
+                status, ctype, body = '200 OK', CONTENT_TYPE, registry.render().encode('utf-8')
+            else:
+                status, ctype, body = '404 Not Found', 'text/plain', b'not found\n'
+            writer.write(
+                f'HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n'
+                f'Connection: close\r\n\r\n'.encode('latin-1') + body)
+            await writer.drain()
+        except (OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
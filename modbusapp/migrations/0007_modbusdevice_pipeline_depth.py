@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modbusapp', '0006_modbusactioncard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modbusdevice',
+            name='pipeline_depth',
+            field=models.IntegerField(default=1, help_text='Max outstanding requests on the shared host:port connection (1 = one at a time)'),
+        ),
+    ]
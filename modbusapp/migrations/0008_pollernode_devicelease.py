@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modbusapp', '0007_modbusdevice_pipeline_depth'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceLease',
+            fields=[
+                ('device', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='lease', serialize=False, to='modbusapp.modbusdevice')),
+                ('owner', models.CharField(blank=True, db_index=True, default='', max_length=200)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PollerNode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+                ('last_seen', models.DateTimeField()),
+            ],
+        ),
+    ]
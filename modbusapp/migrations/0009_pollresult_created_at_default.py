@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modbusapp', '0008_pollernode_devicelease'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pollresult',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
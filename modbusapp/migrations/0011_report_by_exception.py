@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modbusapp', '0010_configversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modbuscard',
+            name='deadband_abs',
+            field=models.FloatField(blank=True, help_text='Override the device absolute deadband for this point', null=True),
+        ),
+        migrations.AddField(
+            model_name='modbuscard',
+            name='deadband_pct',
+            field=models.FloatField(blank=True, help_text='Override the device percent deadband for this point', null=True),
+        ),
+        migrations.AddField(
+            model_name='modbusdevice',
+            name='deadband_abs',
+            field=models.FloatField(default=0, help_text='Absolute change needed to store a new sample'),
+        ),
+        migrations.AddField(
+            model_name='modbusdevice',
+            name='deadband_pct',
+            field=models.FloatField(default=0, help_text='Change needed as a percent of the last stored value'),
+        ),
+        migrations.AddField(
+            model_name='modbusdevice',
+            name='heartbeat_s',
+            field=models.IntegerField(default=60, help_text='Store a sample at least this often in report-by-exception mode'),
+        ),
+        migrations.AddField(
+            model_name='modbusdevice',
+            name='storage_mode',
+            field=models.CharField(choices=[('all', 'Every poll'), ('exception', 'Report by exception')], default='all', max_length=9),
+        ),
+    ]
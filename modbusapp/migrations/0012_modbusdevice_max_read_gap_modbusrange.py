@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modbusapp', '0011_report_by_exception'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modbusdevice',
+            name='max_read_gap',
+            field=models.IntegerField(default=16, help_text='Read across gaps of up to this many unconfigured registers (x16 for bits) to save a request'),
+        ),
+        migrations.CreateModel(
+            name='ModbusRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(choices=[('di', 'Discrete Inputs'), ('ir', 'Input Registers'), ('hr', 'Holding Registers'), ('coil', 'Coils')], default='hr', max_length=4)),
+                ('start', models.IntegerField()),
+                ('count', models.IntegerField()),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranges', to='modbusapp.modbusdevice')),
+            ],
+            options={
+                'ordering': ['device_id', 'table', 'start'],
+            },
+        ),
+    ]
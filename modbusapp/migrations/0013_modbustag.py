@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modbusapp', '0012_modbusdevice_max_read_gap_modbusrange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModbusTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('table', models.CharField(choices=[('ir', 'Input Register'), ('hr', 'Holding Register')], default='hr', max_length=2)),
+                ('address', models.IntegerField(help_text='Absolute address of the first register')),
+                ('datatype', models.CharField(choices=[('u16', 'Unsigned 16-bit'), ('s16', 'Signed 16-bit'), ('u32', 'Unsigned 32-bit'), ('s32', 'Signed 32-bit'), ('f32', 'Float 32-bit'), ('u64', 'Unsigned 64-bit'), ('s64', 'Signed 64-bit'), ('f64', 'Float 64-bit')], default='u16', max_length=3)),
+                ('byte_order', models.CharField(choices=[('big', 'Big-endian'), ('little', 'Little-endian')], default='big', max_length=6)),
+                ('word_order', models.CharField(choices=[('big', 'MSW first'), ('little', 'LSW first')], default='big', max_length=6)),
+                ('scale', models.FloatField(default=1.0, help_text='Multiply the decoded value by this')),
+                ('decimals', models.IntegerField(blank=True, help_text='Round the scaled value (optional)', null=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to='modbusapp.modbusdevice')),
+            ],
+            options={
+                'ordering': ['device_id', 'table', 'address'],
+            },
+        ),
+    ]
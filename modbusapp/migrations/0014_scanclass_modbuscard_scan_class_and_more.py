@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modbusapp', '0013_modbustag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanClass',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('interval_ms', models.IntegerField(default=1000)),
+            ],
+            options={
+                'ordering': ['interval_ms', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='modbuscard',
+            name='scan_class',
+            field=models.ForeignKey(blank=True, help_text='Also poll this point at the scan class rate', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cards', to='modbusapp.scanclass'),
+        ),
+        migrations.AddField(
+            model_name='modbusrange',
+            name='scan_class',
+            field=models.ForeignKey(blank=True, help_text='Poll this range at the scan class rate instead of with the device', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ranges', to='modbusapp.scanclass'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modbusapp', '0014_scanclass_modbuscard_scan_class_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modbusdevice',
+            name='retries',
+            field=models.IntegerField(blank=True, help_text='Fixed retries after a timeout (default: adaptive)', null=True),
+        ),
+        migrations.AddField(
+            model_name='modbusdevice',
+            name='timeout_ms',
+            field=models.IntegerField(blank=True, help_text='Fixed request timeout (default: adaptive)', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modbusapp', '0015_modbusdevice_timeout_retries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modbusdevice',
+            name='max_concurrent_reads',
+            field=models.IntegerField(default=1, help_text='Requests of one poll left outstanding at once (1 = one table after another)'),
+        ),
+    ]
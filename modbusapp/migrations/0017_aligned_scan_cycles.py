@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modbusapp', '0016_modbusdevice_max_concurrent_reads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modbusdevice',
+            name='align_group',
+            field=models.CharField(blank=True, default='', help_text='Devices in the same group are polled on one shared tick and stored as one snapshot', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='pollresult',
+            name='cycle_id',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
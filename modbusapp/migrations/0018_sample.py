@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modbusapp', '0017_aligned_scan_cycles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('hr', 'Holding Register'), ('ir', 'Input Register'), ('di', 'Discrete Input'), ('coil', 'Coil')], max_length=4)),
+                ('address', models.IntegerField()),
+                ('ts', models.DateTimeField()),
+                ('value', models.FloatField()),
+                ('device', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='samples', to='modbusapp.modbusdevice')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['device', 'source', 'address', 'ts'], name='sample_point_ts_idx')],
+            },
+        ),
+    ]
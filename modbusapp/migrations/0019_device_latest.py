@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modbusapp', '0018_sample'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceLatest',
+            fields=[
+                ('device', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest', serialize=False, to='modbusapp.modbusdevice')),
+                ('created_at', models.DateTimeField()),
+                ('discrete_inputs', models.JSONField(default=list)),
+                ('input_registers', models.JSONField(default=list)),
+                ('holding_registers', models.JSONField(default=list)),
+                ('coils', models.JSONField(default=list)),
+                ('ok', models.BooleanField(default=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('cycle_id', models.BigIntegerField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='pollresult',
+            name='device',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='polls', to='modbusapp.modbusdevice'),
+        ),
+        migrations.AddIndex(
+            model_name='pollresult',
+            index=models.Index(fields=['device', '-created_at'], name='pollresult_device_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modbusapp', '0019_device_latest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCursor',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('position', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SampleRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('hr', 'Holding Register'), ('ir', 'Input Register'), ('di', 'Discrete Input'), ('coil', 'Coil')], max_length=4)),
+                ('address', models.IntegerField()),
+                ('resolution', models.IntegerField(choices=[(60, '1 minute'), (3600, '1 hour')], help_text='Bucket width in seconds')),
+                ('bucket', models.DateTimeField(help_text='Start of the bucket')),
+                ('count', models.IntegerField()),
+                ('min', models.FloatField()),
+                ('max', models.FloatField()),
+                ('sum', models.FloatField()),
+                ('last', models.FloatField()),
+                ('last_ts', models.DateTimeField()),
+                ('device', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='modbusapp.modbusdevice')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('device', 'source', 'address', 'resolution', 'bucket'), name='rollup_point_bucket_uniq')],
+            },
+        ),
+    ]
@@ -1,5 +1,8 @@
+import asyncio
+import time
 from contextlib import contextmanager, asynccontextmanager
-from typing import List, Tuple, Any
+from functools import lru_cache
+from typing import Callable, List, Tuple, Any
 from pymodbus.client import ModbusTcpClient
 try:
     from pymodbus.client import AsyncModbusTcpClient  # pymodbus >=3
@@ -7,6 +10,21 @@ except Exception:  # pragma: no cover
     AsyncModbusTcpClient = None  # type: ignore
 import struct
 import inspect
+from .metrics import REGISTRY
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'modbus_request_seconds', 'Round trip of pipelined Modbus requests, from send to response.',
+    ('gateway', 'function'))
+REQUEST_TIMEOUTS = REGISTRY.counter(
+    'modbus_request_timeouts_total', 'Pipelined Modbus requests that got no response in time.', ('gateway',))
+CONNECT_SECONDS = REGISTRY.histogram(
+    'modbus_connect_seconds', 'Time to open a pooled gateway connection, including failed attempts.', ('gateway',))
+CONNECT_FAILURES = REGISTRY.counter(
+    'modbus_connect_failures_total', 'Failed attempts to open a pooled gateway connection.', ('gateway',))
+WRITE_SECONDS = REGISTRY.histogram(
+    'modbus_write_seconds', 'Coil writes to a device, including connecting.', ('device',))
+WRITE_ERRORS = REGISTRY.counter(
+    'modbus_write_errors_total', 'Coil writes that failed or returned a Modbus exception.', ('device',))
 
 
 @contextmanager
@@ -22,13 +40,28 @@ def client_for(host: str, port: int):
             pass
 
 
+@lru_cache(maxsize=None)
+def _unit_params(func: Any) -> tuple[str | None, frozenset]:
+    """Unit-ID keyword a client method takes ('device_id', 'slave' or 'unit'), and all its
+    parameter names. Cached per underlying function so signatures are inspected once."""
+    params = inspect.signature(func).parameters
+    key = next((k for k in ('device_id', 'slave', 'unit') if k in params), None)
+    return key, frozenset(params)
+
+
+def unit_kwarg(method: Any) -> str | None:
+    return _unit_params(getattr(method, '__func__', method))[0]
+
+
+def accepts_kwarg(method: Any, name: str) -> bool:
+    return name in _unit_params(getattr(method, '__func__', method))[1]
+
+
 def _call_with_unit_or_slave(method: Any, *, address: int, unit_id: int, count: int | None = None, values: List[bool] | None = None):
-    """Call pymodbus methods using whichever kwarg the method supports: 'unit' or 'slave'.
-    Uses inspect.signature to choose the correct name and avoids positional ambiguity.
+    """Call pymodbus methods using whichever kwarg the method supports: 'device_id', 'slave' or 'unit'.
+    The choice is cached per method and avoids positional ambiguity.
     """
-    sig = inspect.signature(method)
-    params = sig.parameters
-    key = 'unit' if 'unit' in params else ('slave' if 'slave' in params else None)
+    key, params = _unit_params(getattr(method, '__func__', method))
     kwargs = {'address': address}
     if count is not None:
         kwargs['count'] = count
@@ -67,10 +100,366 @@ async def aclient_for(host: str, port: int):
             pass
 
 
+class ModbusResponse:
+    """Decoded Modbus TCP response, shaped like the pymodbus response objects."""
+
+    __slots__ = ('function_code', 'bits', 'registers', 'exception_code', 'rtt')
+
+    def __init__(self, function_code: int, bits: List[bool] | None = None,
+                 registers: List[int] | None = None, exception_code: int | None = None,
+                 rtt: float | None = None):
+        self.function_code = function_code
+        self.bits = bits if bits is not None else []
+        self.registers = registers if registers is not None else []
+        self.exception_code = exception_code
+        # Seconds from sending the request to its response, excluding time queued for the window
+        self.rtt = rtt
+
+    def isError(self) -> bool:
+        return self.exception_code is not None
+
+    def __str__(self):
+        if self.exception_code is not None:
+            return f"Modbus exception {self.exception_code} (function {self.function_code & 0x7F})"
+        return f"ModbusResponse(function={self.function_code})"
+
+
+class ModbusProtocolError(IOError):
+    """A response that does not answer the request its transaction ID matched."""
+
+
+class GatewayWindow:
+    """Outstanding-request window for one host:port, adapted AIMD-style.
+
+    ``limit`` is the configured pipeline depth. The usable depth halves each
+    time the gateway drops the connection while several requests were in
+    flight, or loses responses for more than one unit within ``span``
+    seconds, and creeps back up by one after every ``recover_after`` clean
+    responses, so the poller settles at the deepest pipeline the gateway
+    actually sustains. Timeouts from a single unit are taken to be that
+    slave being offline, not the gateway overloading, and leave the window
+    alone. A limit of 1 is a plain serialized request queue.
+    """
+
+    __slots__ = ('limit', 'current', 'ok_streak', 'recover_after', 'span', 'silent')
+
+    def __init__(self, limit: int = 1, recover_after: int = 200, span: float = 10.0):
+        self.limit = max(1, int(limit))
+        self.current = self.limit
+        self.ok_streak = 0
+        self.recover_after = recover_after
+        self.span = span
+        # unit id -> monotonic time of its last timeout, until it answers again
+        self.silent: dict[int, float] = {}
+
+    def set_limit(self, limit: int):
+        self.limit = max(1, int(limit))
+        self.current = min(self.current, self.limit)
+
+    def on_success(self, unit_id: int | None = None):
+        if unit_id is not None:
+            self.silent.pop(unit_id, None)
+        self.ok_streak += 1
+        if self.ok_streak >= self.recover_after and self.current < self.limit:
+            self.current += 1
+            self.ok_streak = 0
+
+    def on_timeout(self, unit_id: int, inflight: int):
+        now = time.monotonic()
+        already_silent = unit_id in self.silent
+        self.silent[unit_id] = now
+        if already_silent:
+            # Still offline; its timeouts say nothing about the gateway
+            return
+        if sum(1 for t in self.silent.values() if now - t <= self.span) > 1:
+            self.on_loss(inflight)
+
+    def on_loss(self, inflight: int):
+        self.ok_streak = 0
+        if inflight > 1:
+            self.current = max(1, self.current // 2)
+
+
+class AsyncModbusTcpPipeline:
+    """Minimal asyncio Modbus TCP client that can keep several requests in flight.
+
+    Requests are tagged with MBAP transaction IDs and matched to responses by
+    a single reader task, so one connection can carry many unit IDs behind a
+    gateway. A response from another unit or function than its request raises
+    :class:`ModbusProtocolError`; Modbus exception responses come back as
+    ``isError()`` responses. The number of outstanding requests is bounded by a shared
+    :class:`GatewayWindow`; waiters are admitted in FIFO order. Method names
+    and the ``slave`` keyword mirror pymodbus so the rest of this module can
+    treat both clients alike.
+    """
+
+    def __init__(self, host: str, port: int = 502, *, window: GatewayWindow | None = None,
+                 timeout: float = 3.0):
+        self.host = host
+        self.port = port
+        self.window = window or GatewayWindow()
+        self.gateway = f"{host}:{port}"
+        # Bounds connects, and requests that do not pass a timeout of their own
+        self.timeout = timeout
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._next_tid = 0
+        self._inflight = 0
+        self._slot = asyncio.Condition()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self) -> bool:
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), timeout=self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        self._reader_task = asyncio.create_task(self._read_loop())
+        return True
+
+    async def close(self):
+        writer, self._writer = self._writer, None
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+        self._fail_pending(ConnectionError(f"Connection to {self.host}:{self.port} closed"))
+
+    def _fail_pending(self, exc: Exception):
+        pending, self._pending = self._pending, {}
+        for fut in pending.values():
+            if not fut.done():
+                fut.set_exception(exc)
+
+    async def _read_loop(self):
+        reader = self._reader
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                tid, _pid, length, unit = struct.unpack('>HHHB', header)
+                pdu = await reader.readexactly(length - 1)
+                fut = self._pending.pop(tid, None)
+                # Responses to requests that already timed out are dropped
+                if fut is not None and not fut.done():
+                    fut.set_result((unit, pdu))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.window.on_loss(self._inflight)
+            writer, self._writer = self._writer, None
+            if writer is not None:
+                writer.close()
+            self._fail_pending(ConnectionError(f"Connection to {self.host}:{self.port} lost: {e or 'EOF'}"))
+
+    async def execute(self, unit_id: int, pdu: bytes, timeout: float | None = None) -> bytes:
+        return (await self._execute_timed(unit_id, pdu, timeout))[0]
+
+    async def _execute_timed(self, unit_id: int, pdu: bytes, timeout: float | None = None) -> tuple[bytes, float]:
+        async with self._slot:
+            await self._slot.wait_for(lambda: self._inflight < self.window.current)
+            self._inflight += 1
+        try:
+            if not self.connected:
+                raise ConnectionError(f"Not connected to {self.host}:{self.port}")
+            self._next_tid = (self._next_tid % 0xFFFF) + 1
+            tid = self._next_tid
+            fut = asyncio.get_running_loop().create_future()
+            self._pending[tid] = fut
+            self._writer.write(struct.pack('>HHHB', tid, 0, len(pdu) + 1, unit_id & 0xFF) + pdu)
+            sent = time.monotonic()
+            try:
+                unit, resp = await asyncio.wait_for(fut, timeout=timeout or self.timeout)
+            except asyncio.TimeoutError:
+                self._pending.pop(tid, None)
+                self.window.on_timeout(unit_id, self._inflight)
+                REQUEST_TIMEOUTS.inc(self.gateway)
+                raise TimeoutError(f"No response from unit {unit_id} at {self.host}:{self.port}") from None
+            # A gateway that reuses or mixes up transaction IDs must not hand
+            # one unit's values to another, or one function's to another
+            if unit != unit_id & 0xFF or len(resp) < 2 or resp[0] & 0x7F != pdu[0]:
+                raise ModbusProtocolError(
+                    f"Unit {unit_id} at {self.host}:{self.port} sent function {pdu[0]}, "
+                    f"got a {len(resp)}-byte function {resp[0] if resp else None} response from unit {unit}")
+            self.window.on_success(unit_id)
+            rtt = time.monotonic() - sent
+            REQUEST_SECONDS.observe(rtt, self.gateway, pdu[0])
+            return resp, rtt
+        finally:
+            async with self._slot:
+                self._inflight -= 1
+                self._slot.notify()
+
+    async def _read_bits(self, fc: int, address: int, count: int, unit_id: int, timeout: float | None) -> ModbusResponse:
+        resp, rtt = await self._execute_timed(unit_id, struct.pack('>BHH', fc, address, count), timeout)
+        if resp[0] & 0x80:
+            return ModbusResponse(resp[0], exception_code=resp[1], rtt=rtt)
+        self._check_length(unit_id, resp)
+        data = resp[2:2 + resp[1]]
+        bits = [bool(data[i >> 3] & (1 << (i & 7))) for i in range(min(count, len(data) * 8))]
+        return ModbusResponse(fc, bits=bits, rtt=rtt)
+
+    async def _read_registers(self, fc: int, address: int, count: int, unit_id: int, timeout: float | None) -> ModbusResponse:
+        resp, rtt = await self._execute_timed(unit_id, struct.pack('>BHH', fc, address, count), timeout)
+        if resp[0] & 0x80:
+            return ModbusResponse(resp[0], exception_code=resp[1], rtt=rtt)
+        self._check_length(unit_id, resp)
+        nbytes = resp[1]
+        return ModbusResponse(fc, registers=list(struct.unpack_from(f'>{nbytes // 2}H', resp, 2)), rtt=rtt)
+
+    def _check_length(self, unit_id: int, resp: bytes):
+        if len(resp) < 2 + resp[1]:
+            raise ModbusProtocolError(
+                f"Unit {unit_id} at {self.host}:{self.port} sent {len(resp) - 2} of {resp[1]} data bytes")
+
+    async def read_coils(self, address: int, *, count: int = 1, slave: int = 1, timeout: float | None = None):
+        return await self._read_bits(0x01, address, count, slave, timeout)
+
+    async def read_discrete_inputs(self, address: int, *, count: int = 1, slave: int = 1, timeout: float | None = None):
+        return await self._read_bits(0x02, address, count, slave, timeout)
+
+    async def read_holding_registers(self, address: int, *, count: int = 1, slave: int = 1, timeout: float | None = None):
+        return await self._read_registers(0x03, address, count, slave, timeout)
+
+    async def read_input_registers(self, address: int, *, count: int = 1, slave: int = 1, timeout: float | None = None):
+        return await self._read_registers(0x04, address, count, slave, timeout)
+
+    async def write_coils(self, address: int, values: List[bool], *, slave: int = 1):
+        packed = bytearray((len(values) + 7) // 8)
+        for i, v in enumerate(values):
+            if v:
+                packed[i >> 3] |= 1 << (i & 7)
+        pdu = struct.pack('>BHHB', 0x0F, address, len(values), len(packed)) + bytes(packed)
+        resp = await self.execute(slave, pdu)
+        if resp[0] & 0x80:
+            return ModbusResponse(resp[0], exception_code=resp[1])
+        return ModbusResponse(0x0F)
+
+
+async def _close_quietly(client: Any):
+    try:
+        res = client.close()
+        if inspect.isawaitable(res):
+            await res
+    except Exception:
+        pass
+
+
+class AsyncClientPool:
+    """Long-lived async Modbus TCP clients keyed by host:port.
+
+    Clients are connected lazily on first use and reused across polls, so the
+    steady state never pays for a TCP handshake. Every checkout health-checks
+    the connection and reconnects if the peer dropped it; a failed request that
+    left the socket dead discards it right away. Connections left unused for
+    ``max_idle`` seconds are closed.
+
+    All unit IDs behind one host:port share a single connection. Its pipeline
+    depth is set per gateway with :meth:`configure_gateway` and survives
+    reconnects, including any reduction learned from dropped connections.
+    """
+
+    def __init__(self, max_idle: float = 60.0, timeout: float = 3.0):
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._clients: dict[tuple[str, int], AsyncModbusTcpPipeline] = {}
+        self._windows: dict[tuple[str, int], GatewayWindow] = {}
+        self._last_used: dict[tuple[str, int], float] = {}
+        self._locks: dict[tuple[str, int], asyncio.Lock] = {}
+        self._last_sweep = time.monotonic()
+
+    def configure_gateway(self, host: str, port: int, max_inflight: int):
+        key = (host, int(port))
+        window = self._windows.get(key)
+        if window is None:
+            self._windows[key] = GatewayWindow(max_inflight)
+        elif window.limit != max(1, int(max_inflight)):
+            window.set_limit(max_inflight)
+
+    def window(self, host: str, port: int) -> GatewayWindow:
+        return self._windows.setdefault((host, int(port)), GatewayWindow())
+
+    def _new_client(self, host: str, port: int):
+        return AsyncModbusTcpPipeline(host, port, window=self.window(host, port), timeout=self.timeout)
+
+    async def _checkout(self, key: tuple[str, int]):
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            client = self._clients.get(key)
+            if client is not None and not getattr(client, 'connected', False):
+                # Peer closed the socket or a previous request broke it
+                self._clients.pop(key, None)
+                await _close_quietly(client)
+                client = None
+            if client is None:
+                client = self._new_client(*key)
+                gateway = f"{key[0]}:{key[1]}"
+                started = time.monotonic()
+                connected = await client.connect()
+                CONNECT_SECONDS.observe(time.monotonic() - started, gateway)
+                if not connected:
+                    CONNECT_FAILURES.inc(gateway)
+                    await _close_quietly(client)
+                    raise ConnectionError(f"Failed to connect to {key[0]}:{key[1]}")
+                self._clients[key] = client
+            self._last_used[key] = time.monotonic()
+            return client
+
+    @asynccontextmanager
+    async def acquire(self, host: str, port: int):
+        key = (host, int(port))
+        await self._maybe_sweep()
+        client = await self._checkout(key)
+        try:
+            yield client
+        except Exception:
+            # A failed request on a dropped socket; other unit IDs on the same
+            # gateway keep the connection when it is still up
+            if not getattr(client, 'connected', False) and self._clients.get(key) is client:
+                await self.discard(host, port)
+            raise
+        finally:
+            self._last_used[key] = time.monotonic()
+
+    async def discard(self, host: str, port: int):
+        key = (host, int(port))
+        client = self._clients.pop(key, None)
+        if client is not None:
+            await _close_quietly(client)
+
+    async def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep >= min(5.0, self.max_idle):
+            self._last_sweep = now
+            await self.evict_idle()
+
+    async def evict_idle(self):
+        cutoff = time.monotonic() - self.max_idle
+        for key in [k for k, t in self._last_used.items() if t < cutoff]:
+            self._last_used.pop(key, None)
+            client = self._clients.pop(key, None)
+            if client is not None:
+                await _close_quietly(client)
+
+    async def close(self):
+        clients = list(self._clients.values())
+        self._clients.clear()
+        self._last_used.clear()
+        for client in clients:
+            await _close_quietly(client)
+
+
 async def _acall_with_unit_or_slave(method: Any, *, address: int, unit_id: int, count: int | None = None, values: List[bool] | None = None):
-    sig = inspect.signature(method)
-    params = sig.parameters
-    key = 'unit' if 'unit' in params else ('slave' if 'slave' in params else None)
+    key, params = _unit_params(getattr(method, '__func__', method))
     kwargs = {'address': address}
     if count is not None:
         kwargs['count'] = count
@@ -145,6 +534,40 @@ async def aread_all(client: Any, unit_id: int, di_start: int, di_count: int,
     return result
 
 
+# Registers per value and struct format for each datatype
+REGISTER_FORMATS = {
+    'u16': (1, 'H'), 's16': (1, 'h'),
+    'u32': (2, 'I'), 's32': (2, 'i'), 'f32': (2, 'f'),
+    'u64': (4, 'Q'), 's64': (4, 'q'), 'f64': (4, 'd'),
+}
+
+
+@lru_cache(maxsize=256)
+def _block_structs(endian: str, total: int, words_per: int, fmt: str) -> tuple[struct.Struct, struct.Struct]:
+    return struct.Struct(f'{endian}{total}H'), struct.Struct(f'{endian}{total // words_per}{fmt}')
+
+
+def _decode_block(regs: List[int], words_per: int, fmt: str, endian: str, reverse: bool) -> list:
+    """Decode a whole register block with one pack and one unpack."""
+    total = len(regs) - (len(regs) % words_per)
+    if total <= 0:
+        return []
+    if total != len(regs):
+        regs = regs[:total]
+    if reverse:
+        # LSW first: swap the words of every value, one slice per word position
+        ordered = [0] * total
+        for k in range(words_per):
+            ordered[k::words_per] = regs[words_per - 1 - k::words_per]
+        regs = ordered
+    pack, unpack = _block_structs(endian, total, words_per, fmt)
+    try:
+        buf = pack.pack(*regs)
+    except struct.error:
+        buf = pack.pack(*[int(r) & 0xFFFF for r in regs])
+    return list(unpack.unpack(buf))
+
+
 def decode_holding_registers(regs: List[int], datatype: str = "u16", byte_order: str = "big", word_order: str = "big") -> List[float | int]:
     """Decode a sequence of 16-bit holding registers into typed values.
     datatype: one of u16,s16,u32,s32,f32,u64,s64,f64
@@ -153,34 +576,44 @@ def decode_holding_registers(regs: List[int], datatype: str = "u16", byte_order:
     """
     if not regs:
         return []
-    sizes = {
-        'u16': (1, 'H'), 's16': (1, 'h'),
-        'u32': (2, 'I'), 's32': (2, 'i'), 'f32': (2, 'f'),
-        'u64': (4, 'Q'), 's64': (4, 'q'), 'f64': (4, 'd'),
-    }
-    if datatype not in sizes:
+    if datatype not in REGISTER_FORMATS:
         return regs  # unknown datatype, return raw
-    words_per, fmt = sizes[datatype]
+    words_per, fmt = REGISTER_FORMATS[datatype]
     endian = '>' if byte_order == 'big' else '<'
-    out: List[float | int] = []
-    total = len(regs) - (len(regs) % words_per)
-    for i in range(0, total, words_per):
-        chunk = regs[i:i + words_per]
-        if words_per > 1 and word_order == 'little':
-            chunk = list(reversed(chunk))
-        b = bytearray()
-        for r in chunk:
-            b.extend(int(r & 0xFFFF).to_bytes(2, byteorder=byte_order, signed=False))
-        try:
-            val = struct.unpack(endian + fmt, bytes(b))[0]
-        except struct.error:
-            # If unpack fails (bad length), stop decoding further
-            break
-        out.append(val)
-    return out
+    return _decode_block(regs, words_per, fmt, endian, words_per > 1 and word_order == 'little')
+
+
+def compile_register_decoder(datatype: str = "u16", byte_order: str = "big", word_order: str = "big",
+                             places: int | None = None) -> Callable[[List[int]], list]:
+    """Precompiled equivalent of :func:`decode_holding_registers` plus optional float rounding."""
+    if datatype not in REGISTER_FORMATS:
+        return list
+    words_per, fmt = REGISTER_FORMATS[datatype]
+    endian = '>' if byte_order == 'big' else '<'
+    reverse = words_per > 1 and word_order == 'little'
+    if places is None or fmt not in ('f', 'd'):
+        return lambda regs: _decode_block(regs, words_per, fmt, endian, reverse)
+
+    def decode(regs: List[int]) -> list:
+        return [round(v, places) for v in _decode_block(regs, words_per, fmt, endian, reverse)]
+
+    return decode
+
+
+def _record_write(device, started: float, ok: bool):
+    WRITE_SECONDS.observe(time.monotonic() - started, device.name)
+    if not ok:
+        WRITE_ERRORS.inc(device.name)
 
 
 def write_coils_to_device(device, start: int, values: List[bool]) -> Tuple[bool, str]:
+    started = time.monotonic()
+    ok, err = _write_coils(device, start, values)
+    _record_write(device, started, ok)
+    return ok, err
+
+
+def _write_coils(device, start: int, values: List[bool]) -> Tuple[bool, str]:
     try:
         with client_for(device.host, device.port) as c:
             rr = _call_with_unit_or_slave(c.write_coils, address=start, values=values, unit_id=device.unit_id)
@@ -192,6 +625,13 @@ def write_coils_to_device(device, start: int, values: List[bool]) -> Tuple[bool,
 
 
 async def awrite_coils_to_device(device, start: int, values: List[bool]) -> Tuple[bool, str]:
+    started = time.monotonic()
+    ok, err = await _awrite_coils(device, start, values)
+    _record_write(device, started, ok)
+    return ok, err
+
+
+async def _awrite_coils(device, start: int, values: List[bool]) -> Tuple[bool, str]:
     if AsyncModbusTcpClient is None:
         return False, "AsyncModbusTcpClient not available"
     try:
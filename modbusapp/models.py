@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class ModbusDevice(models.Model):
@@ -37,14 +38,169 @@ class ModbusDevice(models.Model):
     coil_count = models.IntegerField(default=0)
 
     poll_interval_ms = models.IntegerField(default=1000)
+    # Devices sharing host:port (e.g. serial slaves behind a TCP gateway) share one
+    # connection; the gateway uses the smallest depth configured among them.
+    pipeline_depth = models.IntegerField(
+        default=1,
+        help_text='Max outstanding requests on the shared host:port connection (1 = one at a time)',
+    )
+    align_group = models.CharField(
+        max_length=100, blank=True, default='',
+        help_text='Devices in the same group are polled on one shared tick and stored as one snapshot',
+    )
+    max_concurrent_reads = models.IntegerField(
+        default=1,
+        help_text='Requests of one poll left outstanding at once (1 = one table after another)',
+    )
+    # Left empty, the poller adapts request timeouts and retries to the measured round-trip time
+    timeout_ms = models.IntegerField(null=True, blank=True, help_text='Fixed request timeout (default: adaptive)')
+    retries = models.IntegerField(null=True, blank=True, help_text='Fixed retries after a timeout (default: adaptive)')
+    # Report by exception: store a poll only when a value moved beyond its deadband,
+    # plus a heartbeat row. Cards can override the deadband for their point.
+    STORAGE_MODE_CHOICES = [("all", "Every poll"), ("exception", "Report by exception")]
+    storage_mode = models.CharField(max_length=9, choices=STORAGE_MODE_CHOICES, default="all")
+    deadband_abs = models.FloatField(default=0, help_text='Absolute change needed to store a new sample')
+    deadband_pct = models.FloatField(default=0, help_text='Change needed as a percent of the last stored value')
+    heartbeat_s = models.IntegerField(default=60, help_text='Store a sample at least this often in report-by-exception mode')
+    max_read_gap = models.IntegerField(
+        default=16,
+        help_text='Read across gaps of up to this many unconfigured registers (x16 for bits) to save a request',
+    )
 
     def __str__(self):
         return f"{self.name} ({self.host}:{self.port} u{self.unit_id})"
 
+    def scan_ranges(self) -> dict[int | None, dict[str, list[tuple[int, int]]]]:
+        """Configured (start, count) ranges per table, grouped by scan class id.
+
+        ``None`` is the device's own ``poll_interval_ms``: the fields above, ranges
+        without a scan class and tags. Cards with a scan class add their point
+        to that class. An HR card on a device decoding multi-register values
+        without tags has no address of its own and stays at the device rate.
+        """
+        def tables():
+            return {'di': [], 'ir': [], 'hr': [], 'coil': []}
+
+        classes: dict[int | None, dict[str, list[tuple[int, int]]]] = {None: tables()}
+        for table, start, count in (
+            ('di', self.di_start, self.di_count),
+            ('ir', self.ir_start, self.ir_count),
+            ('hr', self.hr_start, self.hr_count),
+            ('coil', self.coil_start, self.coil_count),
+        ):
+            if count > 0:
+                classes[None][table].append((start, count))
+        for r in self.ranges.all():
+            if r.count > 0:
+                classes.setdefault(r.scan_class_id, tables())[r.table].append((r.start, r.count))
+        tags = list(self.tags.all())
+        for tag in tags:
+            classes[None][tag.table].append((tag.address, tag.words))
+        tag_words = {(t.table, t.address): t.words for t in tags}
+        hr_tagged = any(t.table == 'hr' for t in tags)
+        for card in self.cards.all():
+            if card.scan_class_id is None:
+                continue
+            words = tag_words.get((card.source, card.address), 1)
+            if card.source == 'hr' and not hr_tagged and ModbusTag.WORDS.get(self.hr_datatype, 1) > 1:
+                continue
+            classes.setdefault(card.scan_class_id, tables())[card.source].append((card.address, words))
+        return classes
+
+    def table_ranges(self) -> dict[str, list[tuple[int, int]]]:
+        """Configured (start, count) ranges per table across all scan classes."""
+        ranges: dict[str, list[tuple[int, int]]] = {'di': [], 'ir': [], 'hr': [], 'coil': []}
+        for tables in self.scan_ranges().values():
+            for table, rs in tables.items():
+                ranges[table].extend(rs)
+        return ranges
+
+    def scan_classes(self) -> dict[int, 'ScanClass']:
+        """Scan classes used by this device's cards and ranges, by id."""
+        return {
+            obj.scan_class_id: obj.scan_class
+            for obj in [*self.cards.all(), *self.ranges.all()] if obj.scan_class_id is not None
+        }
+
+    @property
+    def table_bases(self) -> dict[str, int]:
+        """Modbus address stored at index 0 of each PollResult array."""
+        legacy = {'di': self.di_start, 'ir': self.ir_start, 'hr': self.hr_start, 'coil': self.coil_start}
+        return {t: min((s for s, _ in rs), default=legacy[t]) for t, rs in self.table_ranges().items()}
+
+
+class ScanClass(models.Model):
+    """Named poll rate for cards and ranges that need updating faster (or slower) than their device."""
+    name = models.CharField(max_length=100, unique=True)
+    interval_ms = models.IntegerField(default=1000)
+
+    class Meta:
+        ordering = ['interval_ms', 'name']
+
+    def __str__(self):
+        return f"{self.name} ({self.interval_ms} ms)"
+
+
+class ModbusRange(models.Model):
+    """Additional address range polled on a device, beyond its per-table start/count."""
+    TABLE_CHOICES = [
+        ('di', 'Discrete Inputs'),
+        ('ir', 'Input Registers'),
+        ('hr', 'Holding Registers'),
+        ('coil', 'Coils'),
+    ]
+    device = models.ForeignKey(ModbusDevice, on_delete=models.CASCADE, related_name='ranges')
+    table = models.CharField(max_length=4, choices=TABLE_CHOICES, default='hr')
+    start = models.IntegerField()
+    count = models.IntegerField()
+    scan_class = models.ForeignKey(
+        ScanClass, on_delete=models.SET_NULL, null=True, blank=True, related_name='ranges',
+        help_text='Poll this range at the scan class rate instead of with the device',
+    )
+
+    class Meta:
+        ordering = ['device_id', 'table', 'start']
+
+    def __str__(self):
+        return f"{self.device.name}: {self.table} {self.start}+{self.count}"
+
+
+class ModbusTag(models.Model):
+    """Typed value at one input or holding register address.
+
+    A table with any tags is stored by address: each tag's decoded, scaled value
+    sits at its own address and the extra registers it spans are null. Untagged
+    registers in that table stay raw 16-bit words, and the device-wide HR decode
+    no longer applies. Tag addresses are polled even outside the device ranges.
+    """
+    TABLE_CHOICES = [('ir', 'Input Register'), ('hr', 'Holding Register')]
+    WORDS = {'u16': 1, 's16': 1, 'u32': 2, 's32': 2, 'f32': 2, 'u64': 4, 's64': 4, 'f64': 4}
+    device = models.ForeignKey(ModbusDevice, on_delete=models.CASCADE, related_name='tags')
+    name = models.CharField(max_length=100)
+    table = models.CharField(max_length=2, choices=TABLE_CHOICES, default='hr')
+    address = models.IntegerField(help_text='Absolute address of the first register')
+    datatype = models.CharField(max_length=3, choices=ModbusDevice.HR_DATATYPE_CHOICES, default="u16")
+    byte_order = models.CharField(max_length=6, choices=ModbusDevice.BYTE_ORDER_CHOICES, default="big")
+    word_order = models.CharField(max_length=6, choices=ModbusDevice.WORD_ORDER_CHOICES, default="big")
+    scale = models.FloatField(default=1.0, help_text='Multiply the decoded value by this')
+    decimals = models.IntegerField(null=True, blank=True, help_text='Round the scaled value (optional)')
+
+    class Meta:
+        ordering = ['device_id', 'table', 'address']
+
+    def __str__(self):
+        return f"{self.device.name}: {self.name} ({self.table}@{self.address} {self.datatype})"
+
+    @property
+    def words(self) -> int:
+        return self.WORDS.get(self.datatype, 1)
+
 
 class PollResult(models.Model):
-    device = models.ForeignKey(ModbusDevice, on_delete=models.CASCADE, related_name='polls')
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Covered by the (device, -created_at) index
+    device = models.ForeignKey(ModbusDevice, on_delete=models.CASCADE, related_name='polls', db_index=False)
+    # Set by the poller at acquisition time; rows may be inserted later in batches
+    created_at = models.DateTimeField(default=timezone.now)
     # Store as JSON for flexibility
     discrete_inputs = models.JSONField(default=list)
     input_registers = models.JSONField(default=list)
@@ -52,9 +208,28 @@ class PollResult(models.Model):
     coils = models.JSONField(default=list)
     ok = models.BooleanField(default=True)
     error = models.TextField(blank=True, default="")
+    # Aligned scan groups: Unix time of the tick in ms, shared by every row of one cycle
+    cycle_id = models.BigIntegerField(null=True, blank=True, db_index=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['device', '-created_at'], name='pollresult_device_recent_idx')]
+
+
+class DeviceLatest(models.Model):
+    """Copy of each device's newest PollResult, upserted with every batch so reads never sort history."""
+    device = models.OneToOneField(ModbusDevice, on_delete=models.CASCADE, primary_key=True, related_name='latest')
+    created_at = models.DateTimeField()
+    discrete_inputs = models.JSONField(default=list)
+    input_registers = models.JSONField(default=list)
+    holding_registers = models.JSONField(default=list)
+    coils = models.JSONField(default=list)
+    ok = models.BooleanField(default=True)
+    error = models.TextField(blank=True, default="")
+    cycle_id = models.BigIntegerField(null=True, blank=True)
+
+    # Copied from PollResult on every upsert
+    FIELDS = ('created_at', 'discrete_inputs', 'input_registers', 'holding_registers', 'coils', 'ok', 'error', 'cycle_id')
 
 
 class ModbusCard(models.Model):
@@ -70,6 +245,12 @@ class ModbusCard(models.Model):
     address = models.IntegerField(help_text='Absolute Modbus address within the selected source')
     unit_label = models.CharField(max_length=32, blank=True, default='')
     decimals = models.IntegerField(null=True, blank=True, help_text='Override decimals for display (optional)')
+    deadband_abs = models.FloatField(null=True, blank=True, help_text='Override the device absolute deadband for this point')
+    deadband_pct = models.FloatField(null=True, blank=True, help_text='Override the device percent deadband for this point')
+    scan_class = models.ForeignKey(
+        ScanClass, on_delete=models.SET_NULL, null=True, blank=True, related_name='cards',
+        help_text='Also poll this point at the scan class rate',
+    )
     order = models.IntegerField(default=0)
 
     class Meta:
@@ -79,6 +260,56 @@ class ModbusCard(models.Model):
         return f"{self.device.name}: {self.name} ({self.source}@{self.address})"
 
 
+class Sample(models.Model):
+    """One value of one card point, written alongside each stored PollResult.
+
+    Charts read these instead of unpacking the JSON arrays of every poll.
+    """
+    # Covered by the point index, which leads with device
+    device = models.ForeignKey(ModbusDevice, on_delete=models.CASCADE, related_name='samples', db_index=False)
+    source = models.CharField(max_length=4, choices=ModbusCard.SOURCE_CHOICES)
+    address = models.IntegerField()
+    ts = models.DateTimeField()
+    # Coils and discrete inputs are stored as 0/1
+    value = models.FloatField()
+
+    class Meta:
+        indexes = [models.Index(fields=['device', 'source', 'address', 'ts'], name='sample_point_ts_idx')]
+
+
+class SampleRollup(models.Model):
+    """Min/max/sum/last of one card point over one minute or hour, built from Sample rows."""
+    RESOLUTION_CHOICES = [(60, '1 minute'), (3600, '1 hour')]
+    # Covered by the unique point bucket index, which leads with device
+    device = models.ForeignKey(ModbusDevice, on_delete=models.CASCADE, related_name='rollups', db_index=False)
+    source = models.CharField(max_length=4, choices=ModbusCard.SOURCE_CHOICES)
+    address = models.IntegerField()
+    resolution = models.IntegerField(choices=RESOLUTION_CHOICES, help_text='Bucket width in seconds')
+    bucket = models.DateTimeField(help_text='Start of the bucket')
+    count = models.IntegerField()
+    min = models.FloatField()
+    max = models.FloatField()
+    sum = models.FloatField()
+    last = models.FloatField()
+    last_ts = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['device', 'source', 'address', 'resolution', 'bucket'],
+                                    name='rollup_point_bucket_uniq'),
+        ]
+
+    @property
+    def avg(self) -> float:
+        return self.sum / self.count
+
+
+class RollupCursor(models.Model):
+    """How far the rollup job has read a table, by primary key."""
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.BigIntegerField(default=0)
+
+
 class ModbusActionCard(models.Model):
     device = models.ForeignKey(ModbusDevice, on_delete=models.CASCADE, related_name='actions')
     name = models.CharField(max_length=100)
@@ -92,3 +323,31 @@ class ModbusActionCard(models.Model):
 
     def __str__(self):
         return f"{self.device.name}: {self.name} (coils@{self.start})"
+
+
+class ConfigVersion(models.Model):
+    """Single-row counter bumped on every device config change, so pollers can
+    detect changes with one cheap query where LISTEN/NOTIFY is unavailable."""
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"config v{self.version}"
+
+
+class PollerNode(models.Model):
+    """A running poller replica; ``last_seen`` is refreshed on every lease heartbeat."""
+    name = models.CharField(max_length=200, unique=True)
+    last_seen = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
+
+
+class DeviceLease(models.Model):
+    """Which poller replica currently owns a device. Expired leases are free to claim."""
+    device = models.OneToOneField(ModbusDevice, on_delete=models.CASCADE, primary_key=True, related_name='lease')
+    owner = models.CharField(max_length=200, blank=True, default='', db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.device_id} -> {self.owner or '(free)'}"
@@ -0,0 +1,231 @@
+"""Optional range partitioning of the history tables by time, on Postgres.
+
+Django still sees ordinary tables; only the storage changes. Inserts and
+time-bounded queries work unchanged, and the planner skips partitions outside
+a query's time range. Retention becomes a metadata operation: an expired
+partition is detached and dropped instead of deleting its rows one by one.
+"""
+import logging
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import DatabaseError, connection, transaction
+from django.utils.dateparse import parse_datetime
+from .models import PollResult, RollupCursor, Sample
+
+logger = logging.getLogger(__name__)
+
+# Name used on the command line -> (model, partition key field)
+TABLES = {
+    'poll_results': (PollResult, 'created_at'),
+    'samples': (Sample, 'ts'),
+}
+INTERVALS = ('day', 'week')
+
+_BOUND = re.compile(r"FROM \((?:'([^']+)'|MINVALUE)\) TO \((?:'([^']+)'|MAXVALUE)\)")
+
+
+def _period_start(ts: datetime, interval: str) -> datetime:
+    day = ts.astimezone(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == 'week':
+        # ISO weeks, starting on Monday
+        day -= timedelta(days=day.weekday())
+    return day
+
+
+def _next_period(start: datetime, interval: str) -> datetime:
+    return _period_start(start + timedelta(days=7 if interval == 'week' else 1), interval)
+
+
+def _table(key: str) -> tuple[str, str]:
+    model, field = TABLES[key]
+    return model._meta.db_table, model._meta.get_field(field).column
+
+
+def is_partitioned(table: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table])
+        return cursor.fetchone() is not None
+
+
+def _parse_bound(text: str | None) -> datetime | None:
+    if text is None:
+        return None
+    ts = parse_datetime(text.replace(' ', 'T'))
+    return ts.replace(tzinfo=dt_timezone.utc) if ts.tzinfo is None else ts
+
+
+def partitions(table: str) -> list[tuple[str, datetime | None, datetime | None]]:
+    """(name, lower, upper) of each range partition, oldest first; None stands for MINVALUE/MAXVALUE."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)",
+            [table],
+        )
+        rows = cursor.fetchall()
+    out = []
+    for name, bound in rows:
+        m = _BOUND.search(bound or '')
+        if m is None:
+            continue  # the default partition
+        out.append((name, _parse_bound(m.group(1)), _parse_bound(m.group(2))))
+    return sorted(out, key=lambda p: (p[2] is None, p[2] or datetime.max.replace(tzinfo=dt_timezone.utc)))
+
+
+def _free_range(start: datetime, end: datetime, ranges) -> tuple[datetime, datetime]:
+    """The part of [start, end) before the first existing partition that overlaps it, after any that covers start."""
+    for _, lower, upper in ranges:
+        if (lower is None or lower <= start) and (upper is None or upper > start):
+            start = upper if upper is not None else end
+        elif lower is not None and start < lower < end:
+            end = lower
+    return start, end
+
+
+def convert(key: str, interval: str = 'day') -> str:
+    """Turn a plain history table into a partitioned one in a single transaction.
+
+    The existing table becomes the ``<table>_legacy`` partition for everything
+    before the next period, so no rows are copied. Its indexes are matched to
+    the new partitioned indexes, and its foreign keys are revalidated once
+    while it is attached, as is its part of the new (id, time) primary key.
+    Stop the pollers first; the table is locked until this commits.
+    """
+    table, column = _table(key)
+    legacy = f'{table}_legacy'
+    qn = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        if is_partitioned(table):
+            return f"{table} is already partitioned"
+        cursor.execute(f"LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(
+            "SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid "
+            "WHERE x.indrelid = to_regclass(%s) AND NOT x.indisprimary", [table])
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'", [table])
+        foreign_keys = cursor.fetchall()
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'", [table])
+        primary_key = cursor.fetchone()[0]
+        cursor.execute(f"SELECT coalesce(max(id), 0) FROM {qn(table)}")
+        max_id = cursor.fetchone()[0]
+
+        # Free the names for the partitioned table. A partition's primary key
+        # must match the parent's (id, time) key, so the legacy one is rebuilt
+        cursor.execute(f"ALTER TABLE {qn(table)} DROP CONSTRAINT {qn(primary_key)}")
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(column)})")
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'", [table])
+        rebuilt = cursor.fetchone()[0]
+        for name in [rebuilt] + [name for name, _ in indexes]:
+            cursor.execute(f"ALTER INDEX {qn(name)} RENAME TO {qn(name[:56] + '_legacy')}")
+        for name, _ in foreign_keys:
+            cursor.execute(f"ALTER TABLE {qn(table)} DROP CONSTRAINT {qn(name)}")
+        # Partitions cannot keep an identity of their own; the parent gets a plain sequence
+        cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+        cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id DROP DEFAULT")
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS) PARTITION BY RANGE ({qn(column)})")
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(column)})")
+        seq = f'{table}_id_seq'
+        cursor.execute(f"DROP SEQUENCE IF EXISTS {qn(seq)}")
+        cursor.execute(f"CREATE SEQUENCE {qn(seq)} START WITH {max_id + 1} OWNED BY {qn(table)}.id")
+        cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval('{seq}')")
+        for _, definition in indexes:
+            # Read before the renames, so it names the new table and the original index;
+            # the matching legacy index is attached to it rather than rebuilt
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+
+        boundary = _next_period(datetime.now(dt_timezone.utc), interval)
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(legacy)} FOR VALUES FROM (MINVALUE) TO (%s)", [boundary])
+        cursor.execute(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+    return f"{table} partitioned by {interval}; existing rows kept in {legacy} until {boundary:%Y-%m-%d}"
+
+
+def create_ahead(key: str, interval: str = 'day', ahead: int = 7) -> list[str]:
+    """Create any missing partitions from the current period to ``ahead`` periods past it; returns their names.
+
+    Rows that landed in the default partition while no partition covered their
+    time, say because this did not run for a few days, are moved into the new
+    partition for their period, starting from the oldest of them. A period that
+    cannot be created is logged and skipped, so it never holds up the rest.
+    """
+    table, column = _table(key)
+    default = f'{table}_default'
+    qn = connection.ops.quote_name
+    now = datetime.now(dt_timezone.utc)
+    start = _period_start(now, interval)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [default])
+        has_default = cursor.fetchone()[0]
+        if has_default:
+            cursor.execute(f"SELECT min({qn(column)}) FROM {qn(default)}")
+            oldest = cursor.fetchone()[0]
+            if oldest is not None:
+                start = min(start, _period_start(oldest, interval))
+    until = _period_start(now, interval)
+    for _ in range(ahead + 1):
+        until = _next_period(until, interval)
+    created = []
+    while start < until:
+        end = _next_period(start, interval)
+        lower, upper = _free_range(start, end, partitions(table))
+        start = end
+        if lower >= upper:
+            continue
+        name = f'{table}_p{lower:%Y%m%d}'
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS)")
+                if has_default:
+                    # Attaching checks the default partition holds no rows of this range
+                    cursor.execute(
+                        f"WITH moved AS (DELETE FROM {qn(default)} WHERE {qn(column)} >= %s AND {qn(column)} < %s "
+                        f"RETURNING *) INSERT INTO {qn(name)} SELECT * FROM moved",
+                        [lower, upper],
+                    )
+                    if cursor.rowcount:
+                        logger.info("Moved %d rows from %s into %s", cursor.rowcount, default, name)
+                cursor.execute(
+                    f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)",
+                    [lower, upper],
+                )
+        except DatabaseError as e:
+            logger.error("Could not create partition %s: %s", name, e)
+            continue
+        created.append(name)
+    return created
+
+
+def expire(key: str, retain_days: float, drop: bool = True) -> list[str]:
+    """Detach, and unless ``drop`` is False drop, partitions wholly older than ``retain_days``.
+
+    Sample partitions holding rows the rollup job has not read yet are kept.
+    """
+    table, _ = _table(key)
+    qn = connection.ops.quote_name
+    cutoff = datetime.now(dt_timezone.utc) - timedelta(days=retain_days)
+    position = None
+    if key == 'samples':
+        position = RollupCursor.objects.filter(name='samples').values_list('position', flat=True).first() or 0
+    expired = []
+    with connection.cursor() as cursor:
+        for name, _, upper in partitions(table):
+            if upper is None or upper > cutoff:
+                continue
+            if position is not None:
+                cursor.execute(f"SELECT coalesce(max(id), 0) FROM {qn(name)}")
+                if cursor.fetchone()[0] > position:
+                    logger.warning("Keeping %s: it has samples that are not rolled up yet", name)
+                    continue
+            with transaction.atomic():
+                cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}")
+                if drop:
+                    cursor.execute(f"DROP TABLE {qn(name)}")
+            expired.append(name)
+    return expired
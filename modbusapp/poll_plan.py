@@ -0,0 +1,187 @@
+import asyncio
+import time
+from typing import Any
+from .health import RequestTiming
+from .metrics import REGISTRY
+from .modbus_client import accepts_kwarg, compile_register_decoder, unit_kwarg
+from .models import ModbusDevice
+from .read_plan import FIELDS, plan_for
+from .tag_map import TagLayout
+
+READ_SECONDS = REGISTRY.histogram(
+    'modbus_read_seconds', 'Time to issue all reads of one poll, retries included.', ('device',))
+DECODE_SECONDS = REGISTRY.histogram(
+    'modbus_decode_seconds', 'Time to lay out and decode the values of one poll.', ('device',))
+READ_RETRIES = REGISTRY.counter(
+    'modbus_read_retries_total', 'Read requests re-sent after a timeout.', ('device',))
+
+_READ_METHODS = {
+    'di': ('read_discrete_inputs', 'bits'),
+    'ir': ('read_input_registers', 'registers'),
+    'hr': ('read_holding_registers', 'registers'),
+    'coil': ('read_coils', 'bits'),
+}
+
+
+class PollPlan:
+    """Everything needed to poll one device (or one of its scan classes), worked out once per config.
+
+    Holds the device's :class:`~modbusapp.read_plan.ReadPlan`, the compiled
+    holding-register decoder and, per client class, the read calls with
+    their keyword arguments already built. :meth:`execute` then only issues
+    requests and copies values into place.
+
+    Each array starts at the lowest configured address of its table.
+    Addresses outside every configured range are None, even when a merged
+    request read them. Tables with tags are decoded by their
+    :class:`~modbusapp.tag_map.TagLayout`; otherwise holding registers are
+    decoded one configured range at a time, so multi-register values never
+    straddle two ranges.
+    """
+
+    __slots__ = ('device', 'reads', 'layout', 'hr_decode', 'concurrency', '_calls', '_label')
+
+    def __init__(self, device: ModbusDevice, scan_class_id: int | None = None):
+        self.device = device
+        plan = plan_for(device, scan_class_id)
+        # (table, start, count, offset into the raw table array)
+        self.reads = tuple(
+            (table, start, count, start - plan.spans[table][0]) for table, start, count in plan.requests
+        )
+        tags = list(device.tags.all())
+        # (table, field, array length, ((offset, count), ...), tag layout or None)
+        self.layout = tuple(
+            (
+                table, FIELDS[table], end - base, tuple((s - base, c) for s, c in plan.ranges[table]),
+                TagLayout([t for t in tags if t.table == table], base, end - base) or None,
+            )
+            for table, (base, end) in plan.spans.items()
+        )
+        self.hr_decode = compile_register_decoder(
+            device.hr_datatype, device.hr_byte_order, device.hr_word_order, places=max(0, device.hr_decimals),
+        )
+        self.concurrency = max(1, device.max_concurrent_reads)
+        self._calls: dict[type, tuple] = {}
+        self._label = device.name
+
+    def _bind(self, client_type: type) -> tuple:
+        calls = []
+        for table, start, count, offset in self.reads:
+            name, attr = _READ_METHODS[table]
+            func = getattr(client_type, name)
+            kwargs = {'count': count}
+            key = unit_kwarg(func)
+            if key:
+                kwargs[key] = self.device.unit_id
+            calls.append((func, start, kwargs, attr, table, offset, count, accepts_kwarg(func, 'timeout')))
+        self._calls[client_type] = calls = tuple(calls)
+        return calls
+
+    async def execute(self, client: Any, timing: RequestTiming | None = None, retries: int = 0) -> dict:
+        """Read and lay out one poll. With ``timing``, each request gets its adaptive
+        timeout and is retried up to ``retries`` times after timing out.
+
+        Up to ``concurrency`` requests are left outstanding at once, so a poll
+        of several tables costs about one round trip on a pipelining connection.
+        """
+        calls = self._calls.get(type(client)) or self._bind(type(client))
+
+        async def issue(call):
+            func, start, kwargs, _, _, _, _, timed = call
+            if timing is None:
+                return await func(client, start, **kwargs)
+            return await self._request(func, client, start, kwargs, timed, timing, retries, self._label)
+
+        started = time.monotonic()
+        if self.concurrency > 1 and len(calls) > 1:
+            limit = asyncio.Semaphore(self.concurrency)
+
+            async def bounded(call):
+                async with limit:
+                    return await issue(call)
+
+            responses = await asyncio.gather(*(bounded(call) for call in calls), return_exceptions=True)
+            for rr in responses:
+                if isinstance(rr, BaseException):
+                    raise rr
+        else:
+            responses = [await issue(call) for call in calls]
+        decoding = time.monotonic()
+        READ_SECONDS.observe(decoding - started, self._label)
+        raw = {table: [None] * length for table, _, length, _, _ in self.layout}
+        for (_, start, _, attr, table, offset, count, _), rr in zip(calls, responses):
+            if rr.isError():
+                raise IOError(f"{table} {start}+{count}: {rr}")
+            values = getattr(rr, attr)[:count]
+            raw[table][offset:offset + len(values)] = values
+        result = {
+            'discrete_inputs': [],
+            'input_registers': [],
+            'holding_registers': [],
+            'coils': [],
+        }
+        for table, field, length, ranges, tags in self.layout:
+            values = raw[table]
+            decode = table == 'hr' and tags is None
+            if decode and len(ranges) == 1 and ranges[0] == (0, length):
+                # Common single-range case: nothing to place
+                if None in values:
+                    values = values[:values.index(None)]
+                result[field] = self.hr_decode(values)
+                continue
+            out = [None] * length
+            for offset, count in ranges:
+                chunk = values[offset:offset + count]
+                if decode:
+                    if None in chunk:
+                        # Short response; decode what arrived
+                        chunk = chunk[:chunk.index(None)]
+                    chunk = self.hr_decode(chunk)
+                out[offset:offset + len(chunk)] = chunk
+            if tags is not None:
+                out = tags.apply(out)
+            while out and out[-1] is None:
+                out.pop()
+            result[field] = out
+        DECODE_SECONDS.observe(time.monotonic() - decoding, self._label)
+        return result
+
+    @staticmethod
+    async def _request(func, client, start: int, kwargs: dict, timed: bool, timing: RequestTiming, retries: int,
+                       label: str):
+        attempt = 0
+        while True:
+            timeout = timing.timeout
+            sent = time.monotonic()
+            try:
+                if timed:
+                    rr = await func(client, start, timeout=timeout, **kwargs)
+                else:
+                    rr = await asyncio.wait_for(func(client, start, **kwargs), timeout)
+            except (TimeoutError, asyncio.TimeoutError):
+                timing.timed_out()
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                READ_RETRIES.inc(label)
+                continue
+            # Prefer the client's own measurement, which leaves out time queued behind other units
+            rtt = getattr(rr, 'rtt', None)
+            timing.observe(rtt if rtt is not None else time.monotonic() - sent)
+            return rr
+
+
+def merge_latest(state: dict, data: dict) -> dict:
+    """Overlay the non-null values of one scan class poll on a device's latest values.
+
+    Returns new lists, so rows already queued for the database keep their values.
+    """
+    merged = {}
+    for field, values in data.items():
+        current = state.get(field) or []
+        out = list(current) + [None] * (len(values) - len(current))
+        for i, v in enumerate(values):
+            if v is not None:
+                out[i] = v
+        merged[field] = out
+    return merged
@@ -0,0 +1,110 @@
+import asyncio
+import cProfile
+import io
+import math
+import platform
+import pstats
+import time
+from asgiref.sync import sync_to_async
+from .metrics import REGISTRY, Histogram
+
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    'poll_event_loop_lag_seconds', 'How late the event loop woke a task that asked to sleep a fixed interval.')
+THREAD_HOP_SECONDS = REGISTRY.histogram(
+    'poll_thread_hop_seconds', 'Round trip of an empty sync_to_async call, i.e. the wait for the ORM thread.')
+
+
+def _quantile(buckets: tuple[float, ...], counts: list[int], q: float) -> float:
+    # Upper bound of the bucket holding the q-th observation
+    rank = q * sum(counts)
+    seen = 0
+    for bound, count in zip(buckets + (math.inf,), counts):
+        seen += count
+        if seen >= rank and count:
+            return bound
+    return 0.0
+
+
+async def watch_event_loop(interval: float = 0.5, hop_every: int = 4):
+    """Record event loop lag every ``interval`` seconds, and the sync_to_async
+    round trip every ``hop_every`` ticks, until cancelled."""
+    tick = 0
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        LOOP_LAG_SECONDS.observe(max(0.0, time.monotonic() - started - interval))
+        tick += 1
+        if tick % hop_every == 0:
+            started = time.monotonic()
+            await sync_to_async(time.monotonic)()
+            THREAD_HOP_SECONDS.observe(time.monotonic() - started)
+
+
+class PollProfile:
+    """One ``poll_modbus --profile`` run: cProfile of the event loop thread plus stage timings.
+
+    Stage timings come from the poller's metric histograms, which also cover
+    work done on other threads (the ORM behind ``sync_to_async``) that
+    cProfile cannot see. The report lists stages in a fixed order with
+    fixed-width columns and function stats with shortened paths, so reports
+    from two releases can be diffed directly. The raw profile is written next
+    to it as ``<path>.prof`` for pstats or snakeviz.
+    """
+
+    def __init__(self, path: str, duration: float = 60.0, cycles: int = 0, top: int = 40):
+        self.path = path
+        self.duration = duration
+        self.cycles = cycles
+        self.top = top
+        self.profiler = cProfile.Profile()
+        self.started = 0.0
+        self.stopped = 0.0
+
+    def start(self):
+        self.started = time.monotonic()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.stopped = time.monotonic()
+
+    async def wait(self, polls) -> None:
+        """Return once ``duration`` seconds have passed or ``polls()`` reaches ``cycles``."""
+        deadline = self.started + self.duration if self.duration > 0 else math.inf
+        while time.monotonic() < deadline:
+            if self.cycles and polls() >= self.cycles:
+                return
+            await asyncio.sleep(min(0.1, max(0.0, deadline - time.monotonic())))
+
+    def report(self, polls: int, options: dict) -> str:
+        out = io.StringIO()
+        elapsed = self.stopped - self.started
+        out.write("poll_modbus profile\n")
+        out.write(f"python {platform.python_version()} on {platform.system()}\n")
+        for key in sorted(options):
+            if key.startswith('profile') or key in ('interval', 'batch_size', 'flush_interval', 'spool_dir', 'once'):
+                out.write(f"  --{key.replace('_', '-')}: {options[key]}\n")
+        out.write(f"elapsed {elapsed:.3f} s, {polls} polls, {polls / elapsed if elapsed else 0:.1f} polls/s\n\n")
+
+        out.write("Stages (wall clock; percentiles are histogram bucket upper bounds)\n")
+        out.write(f"{'stage':<34}{'count':>9}{'total s':>11}{'mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}\n")
+        for metric in sorted(REGISTRY.metrics(), key=lambda m: m.name):
+            if not isinstance(metric, Histogram):
+                continue
+            counts, total = metric.merged()
+            n = sum(counts)
+            if not n:
+                continue
+            q = [_quantile(metric.buckets, counts, p) * 1000 for p in (0.5, 0.95, 0.99)]
+            out.write(f"{metric.name:<34}{n:>9}{total:>11.3f}{total / n * 1000:>10.3f}"
+                      f"{q[0]:>9.1f}{q[1]:>9.1f}{q[2]:>9.1f}\n")
+
+        out.write(f"\nTop {self.top} functions on the event loop thread by cumulative time\n")
+        stats = pstats.Stats(self.profiler, stream=out)
+        stats.strip_dirs().sort_stats('cumulative').print_stats(self.top)
+        return out.getvalue()
+
+    def write(self, polls: int, options: dict):
+        with open(self.path, 'w') as f:
+            f.write(self.report(polls, options))
+        self.profiler.dump_stats(self.path + '.prof')
@@ -0,0 +1,83 @@
+from functools import lru_cache
+
+# Largest quantity one request may ask for (Modbus application protocol, FC 1-4)
+MAX_BITS = 2000
+MAX_REGISTERS = 125
+
+TABLES = ('di', 'ir', 'hr', 'coil')
+BIT_TABLES = ('di', 'coil')
+# PollResult array field for each table
+FIELDS = {'di': 'discrete_inputs', 'ir': 'input_registers', 'hr': 'holding_registers', 'coil': 'coils'}
+
+
+class ReadPlan:
+    """Requests needed to poll a device, and where their values land.
+
+    ``requests`` is a tuple of (table, start, count) covering every configured
+    range in as few round trips as the PDU limits allow. ``ranges`` holds the
+    configured (start, count) ranges per table and ``spans`` the (base, end)
+    address span of each stored array. The base is shared by every scan class
+    of a device, so their arrays line up. Plans are shared between devices with
+    identical ranges and must be treated as read-only.
+    """
+
+    __slots__ = ('requests', 'ranges', 'spans')
+
+    def __init__(self, requests, ranges, spans):
+        self.requests: tuple[tuple[str, int, int], ...] = requests
+        self.ranges: dict[str, tuple[tuple[int, int], ...]] = ranges
+        self.spans: dict[str, tuple[int, int]] = spans
+
+    def __repr__(self):
+        return f"ReadPlan({len(self.requests)} requests)"
+
+
+def _merge(ranges: tuple[tuple[int, int], ...], limit: int, max_gap: int) -> list[tuple[int, int]]:
+    # Union overlapping and adjacent ranges into [start, end) spans
+    spans: list[list[int]] = []
+    for start, count in sorted(ranges):
+        end = start + count
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    # Split anything over the PDU limit, then fold neighbours together while the
+    # skipped gap is small and the request still fits in one PDU
+    out: list[tuple[int, int]] = []
+    for start, end in spans:
+        for a in range(start, end, limit):
+            b = min(a + limit, end)
+            if out and a - out[-1][1] <= max_gap and b - out[-1][0] <= limit:
+                out[-1] = (out[-1][0], b)
+            else:
+                out.append((a, b))
+    return [(a, b - a) for a, b in out]
+
+
+@lru_cache(maxsize=1024)
+def build_plan(ranges: tuple[tuple[str, tuple[tuple[int, int], ...]], ...], max_gap: int,
+               bases: tuple[tuple[str, int], ...] = ()) -> ReadPlan:
+    requests = []
+    spans = {}
+    by_table = dict(ranges)
+    base_of = dict(bases)
+    for table in TABLES:
+        table_ranges = by_table.get(table, ())
+        if not table_ranges:
+            continue
+        if table in BIT_TABLES:
+            # A register's worth of bits costs the same two bytes on the wire
+            limit, gap = MAX_BITS, max_gap * 16
+        else:
+            limit, gap = MAX_REGISTERS, max_gap
+        requests.extend((table, start, count) for start, count in _merge(table_ranges, limit, max(0, gap)))
+        base = min(s for s, _ in table_ranges)
+        spans[table] = (min(base, base_of.get(table, base)), max(s + c for s, c in table_ranges))
+    return ReadPlan(tuple(requests), by_table, spans)
+
+
+def plan_for(device, scan_class_id: int | None = None) -> ReadPlan:
+    """Cached read plan for one scan class of a device's current range configuration."""
+    tables = device.scan_ranges().get(scan_class_id, {})
+    key = tuple((t, tuple(sorted(rs))) for t, rs in tables.items() if rs)
+    return build_plan(key, device.max_read_gap, tuple(sorted(device.table_bases.items())))
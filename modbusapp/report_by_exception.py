@@ -0,0 +1,91 @@
+import time
+from .models import ModbusDevice
+
+# PollResult array fields and the card source each one holds
+TABLES = (
+    ('discrete_inputs', 'di'),
+    ('input_registers', 'ir'),
+    ('holding_registers', 'hr'),
+    ('coils', 'coil'),
+)
+
+
+class _Snapshot:
+    __slots__ = ('device', 'deadbands', 'values', 'ok', 'error', 'stored_at')
+
+    def __init__(self, device: ModbusDevice):
+        self.device = device
+        self.deadbands = self._compile(device)
+        self.values: dict[str, list] | None = None
+        self.ok = None
+        self.error = None
+        self.stored_at = 0.0
+
+    @staticmethod
+    def _compile(device: ModbusDevice) -> dict[tuple[str, int], tuple[float, float]]:
+        # Per-point overrides keyed like card_series indexes arrays: address - range start
+        overrides = {}
+        bases = device.table_bases
+        for card in device.cards.all():
+            if card.deadband_abs is None and card.deadband_pct is None:
+                continue
+            abs_db = device.deadband_abs if card.deadband_abs is None else card.deadband_abs
+            pct_db = device.deadband_pct if card.deadband_pct is None else card.deadband_pct
+            field = next(f for f, src in TABLES if src == card.source)
+            overrides[(field, card.address - bases[card.source])] = (abs_db, pct_db)
+        return overrides
+
+
+class ExceptionFilter:
+    """Report-by-exception gate for poll results, compared in memory.
+
+    A poll is stored when the ok/error state changes, an array changes
+    length, any point moves beyond its deadband relative to the last *stored*
+    sample (so slow drift still gets reported), or ``heartbeat_s`` has passed
+    since the last stored row. The deadband is the larger of the absolute and
+    percent bands; booleans store on any change. Snapshots are rebuilt when
+    the device config object is replaced by a config reload.
+    """
+
+    def __init__(self):
+        self._snapshots: dict[int, _Snapshot] = {}
+
+    def should_store(self, device: ModbusDevice, data: dict, ok: bool = True, error: str = '') -> bool:
+        snap = self._snapshots.get(device.id)
+        if snap is None or snap.device is not device:
+            snap = self._snapshots[device.id] = _Snapshot(device)
+        now = time.monotonic()
+        if (snap.values is None or ok != snap.ok or error != snap.error
+                or now - snap.stored_at >= max(1, device.heartbeat_s)
+                or self._changed(device, snap, data)):
+            snap.values = {field: list(data.get(field) or []) for field, _ in TABLES}
+            snap.ok, snap.error, snap.stored_at = ok, error, now
+            return True
+        return False
+
+    def forget(self, device_id: int):
+        self._snapshots.pop(device_id, None)
+
+    @staticmethod
+    def _changed(device: ModbusDevice, snap: _Snapshot, data: dict) -> bool:
+        default = (device.deadband_abs, device.deadband_pct)
+        for field, _ in TABLES:
+            new = data.get(field) or []
+            old = snap.values[field]
+            if len(new) != len(old):
+                return True
+            for i, (a, b) in enumerate(zip(old, new)):
+                if a == b:
+                    continue
+                if isinstance(a, bool) or isinstance(b, bool) or a is None or b is None:
+                    return True
+                # NaN from float decoding: staying NaN is no change, entering or leaving it is
+                if a != a or b != b:
+                    if a != a and b != b:
+                        continue
+                    return True
+                abs_db, pct_db = snap.deadbands.get((field, i), default)
+                band = max(abs_db, abs(a) * pct_db / 100.0)
+                if abs(b - a) > band:
+                    return True
+        return False
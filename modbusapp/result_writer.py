@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from asgiref.sync import sync_to_async
+from .metrics import REGISTRY
+from .models import PollResult
+from .samples import PERMANENT_ERRORS, salvage_results, store_results
+
+logger = logging.getLogger(__name__)
+
+DB_WRITE_SECONDS = REGISTRY.histogram(
+    'poll_db_write_seconds', 'Time to insert one batch of poll results, failed attempts included.')
+DB_ROWS = REGISTRY.counter('poll_db_rows_total', 'Poll results inserted into the database.')
+DB_FAILURES = REGISTRY.counter('poll_db_write_failures_total', 'Failed poll result batch inserts.')
+DB_DROPPED = REGISTRY.counter('poll_db_dropped_rows_total', 'Poll results dropped because every insert attempt failed or their device was deleted.')
+
+
+class PollResultWriter:
+    """Write-behind queue that stores PollResult rows in batches.
+
+    ``put`` enqueues an unsaved PollResult and returns immediately while there
+    is room; once ``max_pending`` rows are waiting it blocks, which slows the
+    pollers down instead of growing memory without bound. A background task
+    flushes with ``bulk_create`` whenever ``batch_size`` rows are queued or
+    ``flush_interval`` seconds have passed since the first queued row, together
+    with the card point samples of those rows (see :mod:`modbusapp.samples`). A batch
+    that fails to insert is retried with backoff before it is dropped. A batch
+    the database rejects outright (a device deleted since it was polled, say)
+    is split until only the offending rows are left, and just those are dropped. Value arrays are only kept in
+    PollResult with ``arrays`` (see :func:`~modbusapp.samples.store_results`).
+    ``close`` flushes everything still queued.
+    """
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 1.0,
+                 max_pending: int = 10000, retries: int = 3, arrays: bool = False):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.arrays = arrays
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(self.batch_size, max_pending))
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def put(self, row: PollResult):
+        await self._queue.put(row)
+
+    async def put_many(self, rows: list[PollResult]):
+        """Queue rows that must be inserted together, such as one aligned scan cycle."""
+        await self._queue.put(list(rows))
+
+    async def close(self):
+        self._closing = True
+        if self._task is not None:
+            await self._task
+            self._task = None
+        # Anything queued after the flusher exited
+        await self._flush(self._take(self._queue.qsize()))
+
+    def _take(self, limit: int) -> list:
+        rows = []
+        while len(rows) < limit and not self._queue.empty():
+            self._add(rows, self._queue.get_nowait())
+        return rows
+
+    @staticmethod
+    def _add(rows: list, item):
+        if isinstance(item, list):
+            rows.extend(item)
+        else:
+            rows.append(item)
+
+    async def _collect(self) -> list:
+        # Wait for a first row, then give the batch up to flush_interval to fill
+        loop = asyncio.get_running_loop()
+        try:
+            rows = []
+            self._add(rows, await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval))
+        except asyncio.TimeoutError:
+            return []
+        deadline = loop.time() + self.flush_interval
+        while True:
+            rows.extend(self._take(self.batch_size - len(rows)))
+            remaining = deadline - loop.time()
+            if len(rows) >= self.batch_size or remaining <= 0 or self._closing:
+                return rows
+            try:
+                self._add(rows, await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                return rows
+
+    async def _run(self):
+        while not (self._closing and self._queue.empty()):
+            await self._flush(await self._collect())
+
+    async def _flush(self, rows: list):
+        if not rows:
+            return
+        delay = 0.5
+        attempt = 0
+        kwargs = {'batch_size': self.batch_size, 'arrays': self.arrays}
+        while True:
+            started = time.monotonic()
+            stored = []
+            rejected = []
+            try:
+                try:
+                    await sync_to_async(store_results)(rows, **kwargs)
+                except PERMANENT_ERRORS:
+                    DB_FAILURES.inc()
+                    rejected = await sync_to_async(salvage_results)(rows, stored, **kwargs)
+                    if rejected:
+                        DB_DROPPED.inc(amount=len(rejected))
+                        logger.warning("Dropped %d of %d poll results the database rejected", len(rejected), len(rows))
+                DB_WRITE_SECONDS.observe(time.monotonic() - started)
+                DB_ROWS.inc(amount=len(rows) - len(rejected))
+                return
+            except Exception:
+                DB_WRITE_SECONDS.observe(time.monotonic() - started)
+                DB_FAILURES.inc()
+                if stored:
+                    # Parts that committed before the failure are not inserted twice
+                    DB_ROWS.inc(amount=len(stored))
+                    done = {id(r) for r in stored}
+                    rows = [r for r in rows if id(r) not in done]
+                if attempt == self.retries:
+                    DB_DROPPED.inc(amount=len(rows))
+                    logger.exception("Dropping %d poll results after %d failed inserts", len(rows), attempt + 1)
+                    return
+                logger.warning("Bulk insert of %d poll results failed; retrying in %.1fs", len(rows), delay)
+                await asyncio.sleep(delay)
+                delay *= 2
+                attempt += 1
@@ -0,0 +1,214 @@
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+from .downsample import lttb_series
+from .models import PollResult, RollupCursor, Sample, SampleRollup
+from .partitions import is_partitioned
+
+logger = logging.getLogger(__name__)
+
+# Bucket widths in seconds, finest first
+TIERS = tuple(res for res, _ in SampleRollup.RESOLUTION_CHOICES)
+TIER_NAMES = {60: '1m', 3600: '1h'}
+
+_CURSOR = 'samples'
+_MERGED = ('count', 'min', 'max', 'sum', 'last', 'last_ts')
+
+
+def _bucket(epoch: float, resolution: int) -> datetime:
+    return datetime.fromtimestamp(epoch - epoch % resolution, dt_timezone.utc)
+
+
+def _watermark() -> int | None:
+    """Highest sample id below which every insert has committed or rolled back; None if ids commit in order."""
+    if connection.vendor != 'postgresql':
+        # SQLite runs one write transaction at a time
+        return None
+    table = connection.ops.quote_name(Sample._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SET LOCAL lock_timeout = '5s'")
+        # SHARE waits for inserts in flight and holds off new ones for the one
+        # read below; any id handed out after it is higher than what it returns
+        cursor.execute(f"LOCK TABLE {table} IN SHARE MODE")
+        cursor.execute(f"SELECT coalesce(max(id), 0) FROM {table}")
+        return cursor.fetchone()[0]
+
+
+def roll_up(batch_size: int = 50000) -> int:
+    """Fold the next ``batch_size`` new samples into every rollup tier; returns how many were read.
+
+    New samples are found by primary key after a cursor, so each is counted
+    once however late it arrives (a replayed spool, say). Primary keys are
+    handed out before commit, so with several writers a higher id can commit
+    first; the cursor never passes the commit-safe watermark, which keeps it
+    behind rows still in flight. The cursor and the rollup rows change in one
+    transaction.
+    """
+    try:
+        watermark = _watermark()
+    except OperationalError as e:
+        logger.warning("Could not wait out sample inserts in flight (%s); rolling up on the next run", str(e).strip())
+        return 0
+    with transaction.atomic():
+        cursor, _ = RollupCursor.objects.select_for_update().get_or_create(name=_CURSOR)
+        qs = Sample.objects.filter(id__gt=cursor.position)
+        if watermark is not None:
+            qs = qs.filter(id__lte=watermark)
+        rows = list(
+            qs.order_by('id').values_list('id', 'device_id', 'source', 'address', 'ts', 'value')[:batch_size]
+        )
+        if not rows:
+            return 0
+        aggs: dict[tuple, list] = {}
+        for _, device_id, source, address, ts, value in rows:
+            epoch = ts.timestamp()
+            for res in TIERS:
+                key = (device_id, source, address, res, _bucket(epoch, res))
+                a = aggs.get(key)
+                if a is None:
+                    aggs[key] = [1, value, value, value, value, ts]
+                    continue
+                a[0] += 1
+                if value < a[1]:
+                    a[1] = value
+                if value > a[2]:
+                    a[2] = value
+                a[3] += value
+                if ts >= a[5]:
+                    a[4], a[5] = value, ts
+        buckets = [k[4] for k in aggs]
+        stored = SampleRollup.objects.filter(
+            device_id__in={k[0] for k in aggs}, bucket__gte=min(buckets), bucket__lte=max(buckets),
+        )
+        for r in stored:
+            a = aggs.get((r.device_id, r.source, r.address, r.resolution, r.bucket))
+            if a is None:
+                continue
+            a[0] += r.count
+            a[1] = min(a[1], r.min)
+            a[2] = max(a[2], r.max)
+            a[3] += r.sum
+            if r.last_ts > a[5]:
+                a[4], a[5] = r.last, r.last_ts
+        SampleRollup.objects.bulk_create(
+            [
+                SampleRollup(device_id=d, source=s, address=addr, resolution=res, bucket=b,
+                             **dict(zip(_MERGED, a)))
+                for (d, s, addr, res, b), a in aggs.items()
+            ],
+            batch_size=1000, update_conflicts=True,
+            unique_fields=['device', 'source', 'address', 'resolution', 'bucket'], update_fields=list(_MERGED),
+        )
+        cursor.position = rows[-1][0]
+        cursor.save(update_fields=['position'])
+    return len(rows)
+
+
+def _delete_before(qs, chunk: int) -> int:
+    # Bounded deletes keep each transaction and its locks short
+    deleted = 0
+    while True:
+        ids = list(qs.values_list('pk', flat=True)[:chunk])
+        if not ids:
+            return deleted
+        deleted += qs.model.objects.filter(pk__in=ids).delete()[0]
+
+
+def enforce_retention(raw_days: float = 0, minute_days: float = 0, hour_days: float = 0,
+                      chunk: int = 10000) -> dict[str, int]:
+    """Delete data older than each retention (0 keeps it forever); returns rows deleted per kind.
+
+    Raw samples are only deleted once they have been rolled up. Partitioned
+    tables are left to ``partition_history --retain-days``.
+    """
+    now = timezone.now()
+    deleted = {}
+    if raw_days > 0:
+        cutoff = now - timedelta(days=raw_days)
+        position = RollupCursor.objects.filter(name=_CURSOR).values_list('position', flat=True).first() or 0
+        for kind, qs in (
+            ('samples', Sample.objects.filter(ts__lt=cutoff, id__lte=position)),
+            ('poll_results', PollResult.objects.filter(created_at__lt=cutoff)),
+        ):
+            if connection.vendor == 'postgresql' and is_partitioned(qs.model._meta.db_table):
+                continue
+            deleted[kind] = _delete_before(qs, chunk)
+    for res, days in ((60, minute_days), (3600, hour_days)):
+        if days > 0:
+            qs = SampleRollup.objects.filter(resolution=res, bucket__lt=now - timedelta(days=days))
+            deleted[TIER_NAMES[res]] = _delete_before(qs, chunk)
+    return deleted
+
+
+def pick_tier(start: datetime, end: datetime, points: int) -> int | None:
+    """Coarsest tier that still has ``points`` buckets between start and end, or None for raw samples."""
+    span = (end - start).total_seconds()
+    for res in reversed(TIERS):
+        if span / res >= points:
+            return res
+    return None
+
+
+def rollup_series(device_id: int, source: str, address: int, resolution: int,
+                  start: datetime, end: datetime, points: int) -> list[dict]:
+    """Up to ``points`` evenly spaced values between start and end, merged from one tier.
+
+    Each point carries the average as ``v`` plus the min and max of its span,
+    so peaks survive the merge.
+    """
+    rows = (
+        SampleRollup.objects
+        .filter(device_id=device_id, source=source, address=address, resolution=resolution,
+                bucket__gte=_bucket(start.timestamp(), resolution), bucket__lt=end)
+        .order_by('bucket')
+        .values_list('bucket', 'count', 'min', 'max', 'sum')
+    )
+    t0 = start.timestamp()
+    width = max(float(resolution), (end.timestamp() - t0) / points)
+    series = []
+    current = None
+    for bucket, count, lo, hi, total in rows.iterator(chunk_size=2000):
+        slot = max(0, int((bucket.timestamp() - t0) // width))
+        if current is None or slot != current[0]:
+            if current is not None:
+                series.append(_point(current))
+            current = [slot, bucket, count, lo, hi, total]
+            continue
+        current[2] += count
+        current[3] = min(current[3], lo)
+        current[4] = max(current[4], hi)
+        current[5] += total
+    if current is not None:
+        series.append(_point(current))
+    return series
+
+
+def tiered_series(device_id: int, source: str, address: int, resolution: int,
+                  start: datetime, end: datetime, points: int) -> tuple[list[dict], str]:
+    """About ``points`` values between start and end from one tier, and the name of what was read.
+
+    The rollup job trails the samples and its newest bucket may be only partly
+    rolled up, so that bucket and everything after it come from raw samples
+    picked by LTTB. A window the job has not reached at all, say because it is
+    not running, is read from samples entirely.
+    """
+    newest = (
+        SampleRollup.objects
+        .filter(device_id=device_id, source=source, address=address, resolution=resolution,
+                bucket__gte=_bucket(start.timestamp(), resolution), bucket__lt=end)
+        .order_by('-bucket').values_list('bucket', flat=True).first()
+    )
+    head = 0
+    if newest is not None and newest > start:
+        head = round(points * (newest - start).total_seconds() / (end - start).total_seconds())
+    if head == 0:
+        return lttb_series(device_id, source, address, start, end, points), 'lttb'
+    series = rollup_series(device_id, source, address, resolution, start, newest, head)
+    series += lttb_series(device_id, source, address, newest, end, max(3, points - head))
+    return series, TIER_NAMES[resolution]
+
+
+def _point(acc: list) -> dict:
+    _, bucket, count, lo, hi, total = acc
+    return {'t': bucket.isoformat(), 'v': total / count, 'min': lo, 'max': hi}
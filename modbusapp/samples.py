@@ -0,0 +1,156 @@
+import math
+from django.db import DataError, IntegrityError, transaction
+from .metrics import REGISTRY
+from .models import DeviceLatest, ModbusDevice, PollResult, Sample
+from .read_plan import FIELDS
+
+DB_SAMPLES = REGISTRY.counter('poll_db_samples_total', 'Card point samples inserted into the database.')
+
+# Errors a row keeps raising however often it is retried
+PERMANENT_ERRORS = (IntegrityError, DataError)
+
+
+def sample_points(device: ModbusDevice) -> tuple[tuple[str, int, str, int], ...]:
+    """(source, address, PollResult field, index in that field) of each card point of ``device``.
+
+    Uses the prefetched cards, ranges and tags when the device came from the
+    config cache.
+    """
+    bases = device.table_bases
+    points = {}
+    for card in device.cards.all():
+        index = card.address - bases[card.source]
+        if index >= 0:
+            points[card.source, card.address] = (card.source, card.address, FIELDS[card.source], index)
+    return tuple(points.values())
+
+
+def samples_for(row: PollResult, points) -> list[Sample]:
+    if not row.ok:
+        return []
+    samples = []
+    for source, address, field, index in points:
+        values = getattr(row, field) or []
+        if index >= len(values):
+            continue
+        v = values[index]
+        if isinstance(v, bool):
+            v = 1.0 if v else 0.0
+        elif not isinstance(v, (int, float)):
+            continue
+        samples.append(Sample(device_id=row.device_id, source=source, address=address, ts=row.created_at, value=v))
+    return samples
+
+
+def _finite(values: list | None) -> list | None:
+    # NaN and infinities from float decoding are not valid JSON; store them as null
+    if not values or not any(isinstance(v, float) and not math.isfinite(v) for v in values):
+        return values
+    return [None if isinstance(v, float) and not math.isfinite(v) else v for v in values]
+
+
+def load_sample_devices(device_ids) -> dict[int, ModbusDevice]:
+    """Devices with what :func:`sample_points` needs, for rows that only carry a device_id."""
+    qs = ModbusDevice.objects.filter(id__in=set(device_ids)).prefetch_related('cards', 'ranges', 'tags')
+    return {d.id: d for d in qs}
+
+
+def drop_orphans(rows: list[PollResult]) -> list[PollResult]:
+    """``rows`` without those whose device was deleted after they were polled."""
+    ids = set(ModbusDevice.objects.filter(id__in={r.device_id for r in rows}).values_list('id', flat=True))
+    return [r for r in rows if r.device_id in ids]
+
+
+def latest_rows(rows: list[PollResult]) -> list[DeviceLatest]:
+    """The newest of ``rows`` for each device, as DeviceLatest rows."""
+    newest: dict[int, PollResult] = {}
+    for row in rows:
+        current = newest.get(row.device_id)
+        if current is None or row.created_at >= current.created_at:
+            newest[row.device_id] = row
+    return [
+        DeviceLatest(device_id=device_id, **{f: getattr(row, f) for f in DeviceLatest.FIELDS})
+        for device_id, row in newest.items()
+    ]
+
+
+def in_history(row: PollResult) -> bool:
+    """False for a row report-by-exception kept out of history; it only refreshes DeviceLatest."""
+    return getattr(row, 'history', True)
+
+
+def history_rows(rows: list[PollResult]) -> list[PollResult]:
+    """Copies of ``rows`` without their value arrays, which Sample and DeviceLatest already hold."""
+    return [
+        PollResult(device_id=r.device_id, created_at=r.created_at, cycle_id=r.cycle_id, ok=r.ok, error=r.error)
+        for r in rows
+    ]
+
+
+def store_results(rows: list[PollResult], batch_size: int | None = None,
+                  devices: dict[int, ModbusDevice] | None = None, arrays: bool = False) -> int:
+    """Insert poll results and their card point samples, and upsert each
+    device's DeviceLatest, in one transaction.
+
+    PollResult keeps each poll's outcome and time, but its value arrays only
+    when ``arrays`` is set: charted points are stored as samples and the
+    newest arrays in DeviceLatest. Rows not :func:`in_history` only go to
+    DeviceLatest. Points come from ``row.device`` unless ``devices`` maps
+    device ids to loaded devices. Returns the number of samples written.
+    """
+    points: dict[int, tuple] = {}
+    samples = []
+    for row in rows:
+        for field in FIELDS.values():
+            setattr(row, field, _finite(getattr(row, field)))
+    history = [row for row in rows if in_history(row)]
+    for row in history:
+        device = devices.get(row.device_id) if devices is not None else row.device
+        if device is None:
+            continue
+        key = id(device)
+        if key not in points:
+            points[key] = sample_points(device)
+        samples.extend(samples_for(row, points[key]))
+    with transaction.atomic():
+        PollResult.objects.bulk_create(history if arrays else history_rows(history), batch_size=batch_size)
+        Sample.objects.bulk_create(samples, batch_size=batch_size)
+        # One row per device, so the upsert never touches a row twice. Batches
+        # arrive in poll order; a stale spool replayed after a lease handoff is
+        # overwritten by the new holder's next batch.
+        DeviceLatest.objects.bulk_create(
+            latest_rows(rows), update_conflicts=True, unique_fields=['device'],
+            update_fields=list(DeviceLatest.FIELDS),
+        )
+    DB_SAMPLES.inc(amount=len(samples))
+    return len(samples)
+
+
+def salvage_results(rows: list[PollResult], stored: list, **kwargs) -> list[PollResult]:
+    """Store what can be stored of a batch that failed with a permanent error; returns the rows that cannot be.
+
+    Rows of deleted devices are set aside first, then the rest is split in
+    halves until every failing part is a single row. Parts are appended to
+    ``stored`` as they commit, so a caller interrupted by some other error
+    knows which rows not to insert again. ``kwargs`` go to :func:`store_results`.
+    """
+    kept = drop_orphans(rows)
+    keep = {id(r) for r in kept}
+    rejected = [r for r in rows if id(r) not in keep]
+    pending = [kept]
+    while pending:
+        part = pending.pop()
+        if not part:
+            continue
+        try:
+            store_results(part, **kwargs)
+        except PERMANENT_ERRORS:
+            if len(part) == 1:
+                rejected.extend(part)
+                continue
+            mid = len(part) // 2
+            # Older half first, so DeviceLatest ends on the newest row
+            pending += [part[mid:], part[:mid]]
+            continue
+        stored.extend(part)
+    return rejected
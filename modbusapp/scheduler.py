@@ -0,0 +1,161 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+# Golden-ratio sequence: each new entry lands in the largest phase gap left so far
+_PHI = (math.sqrt(5) - 1) / 2
+
+
+class ScheduleStats:
+    __slots__ = ('polls', 'overruns', 'skipped', 'last_lateness', 'max_lateness')
+
+    def __init__(self):
+        self.polls = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+
+
+class _Entry:
+    __slots__ = ('key', 'interval', 'phase', 'gen', 'running', 'removed', 'stats')
+
+    def __init__(self, key: Hashable, interval: float, phase: float):
+        self.key = key
+        self.interval = interval
+        self.phase = phase
+        self.gen = 0  # bumped to invalidate the queued heap item
+        self.running = False
+        self.removed = False
+        self.stats = ScheduleStats()
+
+
+class PollScheduler:
+    """Deadline scheduler for periodic polls driven by one task and a heap.
+
+    Each key polls on a fixed grid ``anchor + phase + k * interval`` of the
+    monotonic clock, so there is no drift and wall-clock jumps do not matter.
+    Phases follow the golden-ratio sequence, which spreads keys with the same
+    interval evenly across it, unless the key is scheduled ``aligned``: then
+    its slots fall on whole multiples of the interval in Unix time, so every
+    aligned key with that interval, in any process, ticks together. A key
+    whose previous poll is still running at
+    its next deadline skips that cycle instead of queueing up; a poll that
+    finishes after its next deadline counts as an overrun. Polls are tasks
+    only while they run, so thousands of keys cost one sleeping task.
+    """
+
+    def __init__(self, poll: Callable[[Any], Awaitable[None]],
+                 on_skip: Callable[[Any, int], None] | None = None):
+        self.poll = poll
+        self.on_skip = on_skip
+        self.anchor = time.monotonic()
+        self._entries: dict[Hashable, _Entry] = {}
+        self._heap: list[tuple[float, int, int, _Entry]] = []
+        self._seq = itertools.count()
+        self._ordinal = itertools.count()
+        self._wake = asyncio.Event()
+        self._running: set[asyncio.Task] = set()
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def keys(self):
+        return self._entries.keys()
+
+    def stats(self, key) -> ScheduleStats | None:
+        entry = self._entries.get(key)
+        return entry.stats if entry else None
+
+    def schedule(self, key: Hashable, interval: float, aligned: bool = False):
+        """Add ``key`` or change its interval, keeping its phase."""
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry(key, interval, (next(self._ordinal) * _PHI) % 1.0)
+        elif entry.interval == interval:
+            return
+        else:
+            entry.interval = interval
+            entry.gen += 1
+        if aligned:
+            entry.phase = self._wall_phase(interval)
+        self._push(entry, self._next_slot(entry, time.monotonic()))
+
+    def _wall_phase(self, interval: float) -> float:
+        # Phase that puts anchor + phase * interval on a multiple of interval in Unix time
+        anchor_wall = time.time() - (time.monotonic() - self.anchor)
+        return (-anchor_wall % interval) / interval
+
+    def remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.removed = True
+
+    def _next_slot(self, entry: _Entry, now: float) -> float:
+        offset = self.anchor + entry.phase * entry.interval
+        k = math.floor((now - offset) / entry.interval) + 1
+        return offset + k * entry.interval
+
+    def _push(self, entry: _Entry, deadline: float):
+        heapq.heappush(self._heap, (deadline, next(self._seq), entry.gen, entry))
+        self._wake.set()
+
+    async def run(self):
+        try:
+            while True:
+                if not self._heap:
+                    self._wake.clear()
+                    await self._wake.wait()
+                    continue
+                deadline, _, gen, entry = self._heap[0]
+                now = time.monotonic()
+                if deadline > now:
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=deadline - now)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                heapq.heappop(self._heap)
+                if entry.removed or gen != entry.gen:
+                    continue
+                self._dispatch(entry, deadline, now)
+                # Next grid slot after now; slots already missed are skipped, not bunched
+                nxt = deadline + entry.interval
+                if nxt <= now:
+                    missed = math.floor((now - deadline) / entry.interval)
+                    entry.stats.skipped += missed
+                    if self.on_skip:
+                        self.on_skip(entry.key, missed)
+                    nxt = deadline + (missed + 1) * entry.interval
+                self._push(entry, nxt)
+        finally:
+            for task in list(self._running):
+                task.cancel()
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    def _dispatch(self, entry: _Entry, deadline: float, now: float):
+        if entry.running:
+            entry.stats.skipped += 1
+            if self.on_skip:
+                self.on_skip(entry.key, 1)
+            return
+        lateness = now - deadline
+        entry.stats.last_lateness = lateness
+        entry.stats.max_lateness = max(entry.stats.max_lateness, lateness)
+        entry.running = True
+        task = asyncio.create_task(self._fire(entry, deadline))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _fire(self, entry: _Entry, deadline: float):
+        try:
+            await self.poll(entry.key)
+        finally:
+            entry.running = False
+            entry.stats.polls += 1
+            if time.monotonic() > deadline + entry.interval:
+                entry.stats.overruns += 1
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from .config_cache import notify_config_changed
+from .models import ModbusCard, ModbusDevice, ModbusRange, ModbusTag, ScanClass
+
+# Models whose changes alter what or how the poller polls
+CONFIG_MODELS = (ModbusDevice, ModbusCard, ModbusRange, ModbusTag, ScanClass)
+
+
+def config_changed(sender, instance, using, **kwargs):
+    notify_config_changed(f"{sender._meta.model_name}:{instance.pk}", using=using)
+
+
+for _model in CONFIG_MODELS:
+    post_save.connect(config_changed, sender=_model, dispatch_uid=f'config_changed_save_{_model.__name__}')
+    post_delete.connect(config_changed, sender=_model, dispatch_uid=f'config_changed_delete_{_model.__name__}')
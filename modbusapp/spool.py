@@ -0,0 +1,221 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from asgiref.sync import sync_to_async
+from django.utils.dateparse import parse_datetime
+from .metrics import REGISTRY
+from .models import PollResult
+from .result_writer import DB_DROPPED, DB_FAILURES, DB_ROWS, DB_WRITE_SECONDS
+from .samples import PERMANENT_ERRORS, in_history, load_sample_devices, salvage_results, store_results
+
+logger = logging.getLogger(__name__)
+
+SPOOL_REJECTED = REGISTRY.counter(
+    'poll_spool_rejected_rows_total', 'Spooled poll results moved to a *.bad file because they cannot be stored.')
+
+_FIELDS = ('discrete_inputs', 'input_registers', 'holding_registers', 'coils', 'ok', 'error', 'cycle_id')
+
+
+def _encode(row: PollResult) -> bytes:
+    rec = {'device_id': row.device_id, 'created_at': row.created_at.isoformat()}
+    for f in _FIELDS:
+        rec[f] = getattr(row, f)
+    if not in_history(row):
+        rec['history'] = False
+    return (json.dumps(rec, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def _decode(line: bytes) -> PollResult:
+    rec = json.loads(line)
+    rec['created_at'] = parse_datetime(rec['created_at'])
+    history = rec.pop('history', True)
+    row = PollResult(**rec)
+    if not history:
+        row.history = False
+    return row
+
+
+class SpoolWriter:
+    """Poll result sink that appends to a local segmented spool before the database.
+
+    ``put`` appends one JSON line to the active segment file, so polling never
+    waits on the database. The active segment (``*.part``) is sealed into a
+    ``*.seg`` file every ``segment_seconds`` or ``segment_bytes``, and a drain
+    task inserts sealed segments into PollResult with ``bulk_create`` in
+    ``batch_size`` chunks, deleting each segment once it is fully stored.
+    While the database is down, segments pile up on disk and are replayed
+    oldest first when it comes back, including after a poller restart.
+
+    Delivery is at-least-once: progress inside a segment is checkpointed after
+    every committed batch, so a crash can replay at most one batch. Rows of
+    devices deleted since they were spooled are skipped, and lines the
+    database rejects outright or that do not parse are moved to a ``*.bad``
+    file next to their segment, so they never hold up the segments behind them.
+    Drop-in replacement for :class:`~modbusapp.result_writer.PollResultWriter`.
+    """
+
+    def __init__(self, directory: str, batch_size: int = 500, segment_seconds: float = 1.0,
+                 segment_bytes: int = 8 * 1024 * 1024, fsync: bool = True, arrays: bool = False):
+        self.directory = Path(directory)
+        self.batch_size = max(1, batch_size)
+        self.segment_seconds = segment_seconds
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.arrays = arrays
+        self._file = None
+        self._part: Path | None = None
+        self._opened_at = 0.0
+        self._seq = 0
+        self._sealed = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+    def start(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        seqs = [int(p.stem) for p in self.directory.iterdir() if p.suffix in ('.part', '.seg') and p.stem.isdigit()]
+        self._seq = max(seqs, default=0)
+        # Segments left active by a crash are sealed and replayed like any other
+        for part in sorted(self.directory.glob('*.part')):
+            part.rename(part.with_suffix('.seg'))
+        self._sealed.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain_loop())
+
+    @property
+    def pending(self) -> int:
+        return len(list(self.directory.glob('*.seg')))
+
+    async def put(self, row: PollResult):
+        await self.put_many((row,))
+
+    async def put_many(self, rows):
+        # One write, so rows of a scan cycle always share a segment
+        if self._file is None:
+            self._seq += 1
+            self._part = self.directory / f'{self._seq:012d}.part'
+            self._file = open(self._part, 'ab')
+            self._opened_at = time.monotonic()
+        self._file.write(b''.join(_encode(row) for row in rows))
+        self._file.flush()
+        if (self._file.tell() >= self.segment_bytes
+                or time.monotonic() - self._opened_at >= self.segment_seconds):
+            await self._seal()
+
+    async def _seal(self):
+        f, part = self._file, self._part
+        self._file = self._part = None
+        if f is None:
+            return
+        if self.fsync:
+            await asyncio.to_thread(os.fsync, f.fileno())
+        f.close()
+        part.rename(part.with_suffix('.seg'))
+        self._sealed.set()
+
+    async def close(self):
+        await self._seal()
+        # The drain loop makes one last pass over every sealed segment
+        self._closing = True
+        self._stopping.set()
+        self._sealed.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _drain_loop(self):
+        delay = 0.5
+        while True:
+            closing = self._closing
+            if not closing:
+                try:
+                    await asyncio.wait_for(self._sealed.wait(), timeout=self.segment_seconds)
+                except asyncio.TimeoutError:
+                    # Seal a quiet segment so its rows do not wait for the next put
+                    if self._file is not None and time.monotonic() - self._opened_at >= self.segment_seconds:
+                        await self._seal()
+            self._sealed.clear()
+            try:
+                for seg in sorted(self.directory.glob('*.seg')):
+                    await sync_to_async(self._drain_segment)(seg)
+                delay = 0.5
+            except Exception as e:
+                if closing:
+                    logger.warning("Database unavailable at shutdown; %d spool segment(s) kept in %s",
+                                   self.pending, self.directory)
+                    return
+                logger.warning("Spool drain failed (%s); retrying in %.1fs", e, delay)
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(delay * 2, 30.0)
+                self._sealed.set()
+                continue
+            if closing:
+                return
+
+    def _insert(self, seg: Path, batch: list):
+        started = time.monotonic()
+        rejected = []
+        try:
+            devices = load_sample_devices(r.device_id for r in batch)
+            kept = [r for r in batch if r.device_id in devices]
+            if kept:
+                try:
+                    store_results(kept, devices=devices, arrays=self.arrays)
+                except PERMANENT_ERRORS:
+                    DB_FAILURES.inc()
+                    rejected = salvage_results(kept, [], devices=devices, arrays=self.arrays)
+        except Exception:
+            DB_FAILURES.inc()
+            raise
+        finally:
+            DB_WRITE_SECONDS.observe(time.monotonic() - started)
+        if len(kept) < len(batch):
+            DB_DROPPED.inc(amount=len(batch) - len(kept))
+            logger.warning("Skipped %d spooled poll results of deleted devices", len(batch) - len(kept))
+        if rejected:
+            self._set_aside(seg, [_encode(r) for r in rejected])
+        DB_ROWS.inc(amount=len(kept) - len(rejected))
+
+    @staticmethod
+    def _set_aside(seg: Path, lines: list[bytes]):
+        bad = seg.with_suffix('.bad')
+        with open(bad, 'ab') as f:
+            f.write(b''.join(lines))
+        SPOOL_REJECTED.inc(amount=len(lines))
+        logger.error("Moved %d spooled poll results that cannot be stored to %s", len(lines), bad)
+
+    def _drain_segment(self, seg: Path):
+        done_path = seg.with_suffix('.done')
+        skip = int(done_path.read_text() or 0) if done_path.exists() else 0
+        done = skip
+        batch = []
+        unreadable = []
+        with open(seg, 'rb') as f:
+            for i, line in enumerate(f):
+                if i < skip:
+                    continue
+                if not line.endswith(b'\n'):
+                    break  # torn write from a crash
+                try:
+                    batch.append(_decode(line))
+                except (KeyError, ValueError, TypeError):
+                    unreadable.append(line)
+                if len(batch) + len(unreadable) >= self.batch_size:
+                    self._insert(seg, batch)
+                    if unreadable:
+                        self._set_aside(seg, unreadable)
+                    done += len(batch) + len(unreadable)
+                    batch, unreadable = [], []
+                    done_path.write_text(str(done))
+        if batch:
+            self._insert(seg, batch)
+        if unreadable:
+            self._set_aside(seg, unreadable)
+        seg.unlink()
+        done_path.unlink(missing_ok=True)
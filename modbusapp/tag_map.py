@@ -0,0 +1,88 @@
+import struct
+from typing import Iterable
+from .modbus_client import REGISTER_FORMATS
+
+
+class TagLayout:
+    """Decode every tag of one register table in a single pass over the block.
+
+    The block is packed at most four times: big- or little-endian registers,
+    each in forward or reversed word order. A LSW-first tag spanning words
+    ``[i, i+n)`` reads MSW-first from the reversed buffer at ``length - i - n``.
+    The tags read from each buffer are compiled into one ``struct.Struct``
+    with pad bytes between them. Tags that overlap get a struct of their own.
+    """
+
+    __slots__ = ('length', 'groups', 'packers', 'tails', 'spans')
+
+    def __init__(self, tags: Iterable, base: int, length: int):
+        self.length = length
+        buffers: dict[tuple[str, bool], list[tuple]] = {}
+        tails = []
+        spans = []
+        for tag in tags:
+            if tag.datatype not in REGISTER_FORMATS:
+                continue
+            words, fmt = REGISTER_FORMATS[tag.datatype]
+            index = tag.address - base
+            if index < 0 or index + words > length:
+                continue
+            endian = '>' if tag.byte_order == 'big' else '<'
+            reverse = words > 1 and tag.word_order == 'little'
+            offset = length - index - words if reverse else index
+            places = tag.decimals
+            buffers.setdefault((endian, reverse), []).append((offset, words, fmt, index, tag.scale, places))
+            tails.extend(range(index + 1, index + words))
+            spans.append((index, words))
+        self.groups = []
+        for (endian, reverse), items in buffers.items():
+            runs: list[list[tuple]] = []
+            for item in sorted(items):
+                for run in runs:
+                    last = run[-1]
+                    if last[0] + last[1] <= item[0]:
+                        run.append(item)
+                        break
+                else:
+                    runs.append([item])
+            for run in runs:
+                parts = []
+                pos = 0
+                for offset, words, fmt, *_ in run:
+                    if offset > pos:
+                        parts.append(f'{(offset - pos) * 2}x')
+                    parts.append(fmt)
+                    pos = offset + words
+                targets = tuple((index, scale, places) for _, _, _, index, scale, places in run)
+                self.groups.append((endian, reverse, struct.Struct(endian + ''.join(parts)), targets))
+        self.packers = {e: struct.Struct(f'{e}{length}H') for e in {g[0] for g in self.groups}}
+        self.tails = tuple(tails)
+        self.spans = tuple(spans)
+
+    def __bool__(self):
+        return bool(self.groups)
+
+    def apply(self, block: list) -> list:
+        """Return ``block`` (raw words, None where not read) with tag values in place."""
+        missing = None in block
+        words = [0 if v is None else v & 0xFFFF for v in block] if missing else block
+        out = list(block)
+        for i in self.tails:
+            out[i] = None
+        buffers: dict[tuple[str, bool], bytes] = {}
+        for endian, reverse, unpacker, targets in self.groups:
+            buf = buffers.get((endian, reverse))
+            if buf is None:
+                buf = buffers[endian, reverse] = self.packers[endian].pack(*(words[::-1] if reverse else words))
+            for (index, scale, places), value in zip(targets, unpacker.unpack_from(buf)):
+                if scale != 1:
+                    value = value * scale
+                if places is not None:
+                    value = round(value, places)
+                out[index] = value
+        if missing:
+            # A tag with any register unread has no value
+            for index, words_per in self.spans:
+                if None in block[index:index + words_per]:
+                    out[index] = None
+        return out
@@ -1,10 +1,15 @@
 import json
-from django.http import JsonResponse, HttpResponseBadRequest
+from datetime import timedelta
+from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import render
-from .models import ModbusDevice, PollResult, ModbusCard, ModbusActionCard
+from django.utils import timezone
+from .models import DeviceLatest, ModbusDevice, PollResult, ModbusCard, ModbusActionCard, Sample
+from .downsample import lttb_series
+from .metrics import CONTENT_TYPE, REGISTRY
 from .modbus_client import write_coils_to_device
+from .rollups import pick_tier, tiered_series
 
 
 def list_devices(request):
@@ -13,18 +18,23 @@ def list_devices(request):
 
 
 def last_poll(request, device_id: int):
-    try:
-        device = ModbusDevice.objects.get(id=device_id)
-    except ModbusDevice.DoesNotExist:
-        return JsonResponse({'error': 'device not found'}, status=404)
-    poll = device.polls.first()
+    # One primary-key read, however long the history
+    poll = DeviceLatest.objects.filter(device_id=device_id).first()
+    if poll is None:
+        try:
+            device = ModbusDevice.objects.get(id=device_id)
+        except ModbusDevice.DoesNotExist:
+            return JsonResponse({'error': 'device not found'}, status=404)
+        # Devices last polled before DeviceLatest existed
+        poll = device.polls.first()
     if not poll:
         return JsonResponse({'message': 'no data yet'})
     return JsonResponse({
-        'device': device.id,
+        'device': device_id,
         'created_at': poll.created_at.isoformat(),
         'ok': poll.ok,
         'error': poll.error,
+        'cycle_id': poll.cycle_id,
         'discrete_inputs': poll.discrete_inputs,
         'input_registers': poll.input_registers,
         'holding_registers': poll.holding_registers,
@@ -53,42 +63,23 @@ def write_coils(request, device_id: int):
 
 
 def dashboard(request):
-    devices = ModbusDevice.objects.filter(enabled=True).prefetch_related('cards', 'actions').order_by('id')[:8]
+    devices = ModbusDevice.objects.filter(enabled=True).prefetch_related('cards', 'actions', 'ranges', 'tags').order_by('id')
     return render(request, 'modbusapp/dashboard.html', {'devices': devices})
 
 
-def card_series(request, device_id: int, card_id: int):
-    # Params: ?limit=1000 (samples), optional since=ISO8601 to bound start time
-    try:
-        device = ModbusDevice.objects.get(id=device_id, enabled=True)
-    except ModbusDevice.DoesNotExist:
-        return JsonResponse({'error': 'device not found'}, status=404)
-    try:
-        card = ModbusCard.objects.get(id=card_id, device=device)
-    except ModbusCard.DoesNotExist:
-        return JsonResponse({'error': 'card not found'}, status=404)
-
-    try:
-        limit = int(request.GET.get('limit', 300))
-    except Exception:
-        limit = 300
-    limit = max(10, min(2000, limit))
-
-    since_param = request.GET.get('since')
+def _poll_result_series(device, card, since, limit: int) -> list[dict]:
     qs = PollResult.objects.filter(device=device)
-    if since_param:
-        from django.utils.dateparse import parse_datetime
-        dt = parse_datetime(since_param)
-        if dt is not None:
-            qs = qs.filter(created_at__gte=dt)
+    if since is not None:
+        qs = qs.filter(created_at__gte=since)
     # Fetch newest-first then reverse to chronological
     rows = list(qs.order_by('-created_at').values('created_at', 'discrete_inputs', 'input_registers', 'holding_registers', 'coils')[:limit])
     rows.reverse()
 
-    # Determine index offset based on card source and device starts
+    # Determine index offset based on card source and where each stored array starts
     src = card.source
     addr = card.address
-    di_start, ir_start, hr_start, coil_start = device.di_start, device.ir_start, device.hr_start, device.coil_start
+    bases = device.table_bases
+    di_start, ir_start, hr_start, coil_start = bases['di'], bases['ir'], bases['hr'], bases['coil']
     series = []
     for r in rows:
         ts = r['created_at'].isoformat()
@@ -121,7 +112,91 @@ def card_series(request, device_id: int, card_id: int):
                         # non-numeric, skip
                         val = None
         series.append({'t': ts, 'v': val})
+    return series
+
+
+def card_series(request, device_id: int, card_id: int):
+    # Params: ?limit=1000 (samples), optional since=ISO8601 to bound start time
+    try:
+        device = ModbusDevice.objects.get(id=device_id, enabled=True)
+    except ModbusDevice.DoesNotExist:
+        return JsonResponse({'error': 'device not found'}, status=404)
+    try:
+        card = ModbusCard.objects.get(id=card_id, device=device)
+    except ModbusCard.DoesNotExist:
+        return JsonResponse({'error': 'card not found'}, status=404)
+
+    if 'points' in request.GET:
+        return _downsampled_series(request, device, card)
 
+    try:
+        limit = int(request.GET.get('limit', 300))
+    except Exception:
+        limit = 300
+    limit = max(10, min(2000, limit))
+
+    since = None
+    since_param = request.GET.get('since')
+    if since_param:
+        from django.utils.dateparse import parse_datetime
+        since = parse_datetime(since_param)
+        if since is not None and timezone.is_naive(since):
+            since = timezone.make_aware(since)
+    now = timezone.now()
+    tier = pick_tier(since, now, limit) if since is not None else None
+    if tier is not None:
+        # Long windows read the coarsest rollup tier that still fills `limit` points
+        series, name = tiered_series(device.id, card.source, card.address, tier, since, now, limit)
+        return _series_response(device, card, series, name)
+    point = Sample.objects.filter(device=device, source=card.source, address=card.address)
+    qs = point.filter(ts__gte=since) if since is not None else point
+    # Newest first through the point index, then back to chronological
+    rows = list(qs.order_by('-ts').values_list('ts', 'value')[:limit])
+    rows.reverse()
+    if not rows and not point.exists():
+        # Points polled before samples were recorded only exist in PollResult
+        series = _poll_result_series(device, card, since, limit)
+    else:
+        series = [{'t': ts.isoformat(), 'v': v} for ts, v in rows]
+    return _series_response(device, card, series, 'raw')
+
+
+def _downsampled_series(request, device, card) -> JsonResponse:
+    # Params: ?points=500, optional from/to=ISO8601 (default: the last 24 hours)
+    from django.utils.dateparse import parse_datetime
+    try:
+        points = int(request.GET['points'])
+    except Exception:
+        points = 500
+    points = max(10, min(2000, points))
+    bounds = []
+    for param in (request.GET.get('from') or request.GET.get('since'), request.GET.get('to')):
+        if not param:
+            bounds.append(None)
+            continue
+        try:
+            t = parse_datetime(param)
+        except ValueError:
+            t = None
+        if t is None:
+            return HttpResponseBadRequest('from and to must be ISO8601 datetimes')
+        bounds.append(timezone.make_aware(t) if timezone.is_naive(t) else t)
+    start, end = bounds
+    if end is None:
+        end = timezone.now()
+    if start is None:
+        start = end - timedelta(days=1)
+    if start >= end:
+        return HttpResponseBadRequest('from must be before to')
+    tier = pick_tier(start, end, points)
+    if tier is not None:
+        series, name = tiered_series(device.id, card.source, card.address, tier, start, end, points)
+        return _series_response(device, card, series, name)
+    series = lttb_series(device.id, card.source, card.address, start, end, points)
+    return _series_response(device, card, series, 'lttb')
+
+
+def _series_response(device, card, series: list[dict], tier: str) -> JsonResponse:
     return JsonResponse({
         'device': device.id,
         'card': card.id,
@@ -129,6 +204,7 @@ def card_series(request, device_id: int, card_id: int):
         'unit': card.unit_label,
         'source': card.source,
         'address': card.address,
+        'tier': tier,
         'series': series,
     })
 
@@ -157,3 +233,8 @@ def execute_action(request, device_id: int, action_id: int):
         return JsonResponse({'error': 'action values misconfigured'}, status=500)
     ok, err = write_coils_to_device(device, action.start, values)
     return JsonResponse({'ok': ok, 'error': err, 'which': which}, status=200 if ok else 500)
+
+
+def metrics(request):
+    # Coil writes made by this web worker; the poller serves its own with --metrics-port
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)